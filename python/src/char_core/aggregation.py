@@ -0,0 +1,204 @@
+"""
+Incremental aggregation of results of a member, see
+`AggregationStrategy.aggregator`.
+
+An aggregation is a state created by `init`, values are folded into it
+with `update`, states of partial aggregations are combined with
+`merge` and turned into the aggregated result with `finalize`.  States
+don't keep the values, so their size doesn't depend on the number of
+results, and are stored between updates as json, see `dump` and `load`.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Generic, TypeVar
+
+from char_core.sketches import LogSketch
+
+_S = TypeVar("_S")
+
+
+class Aggregator(Generic[_S]):
+    def init(self) -> _S:
+        raise NotImplementedError
+
+    def update(self, state: _S, value: float, order: Any = None) -> _S:
+        """
+        :param order: comparable position of the value among others,
+         e.g. creation time.  Values without one are considered added
+         after all the previous ones.
+        """
+        raise NotImplementedError
+
+    def merge(self, state: _S, other: _S) -> _S:
+        raise NotImplementedError
+
+    def finalize(self, state: _S) -> float:
+        raise NotImplementedError
+
+    def dump(self, state: _S) -> Any:
+        """Json compatible representation of the state."""
+        return state
+
+    def load(self, data: Any) -> _S:
+        return data
+
+
+def _freeze(data: Any) -> Any:
+    # json arrays back into tuples, which are compared with tuples
+    if isinstance(data, list):
+        return tuple(map(_freeze, data))
+    return data
+
+
+def _add_exact(partials: list[float], value: float) -> list[float]:
+    # non overlapping partials of Shewchuk's algorithm, as in math.fsum,
+    # there are at most a few dozen of them for any number of values
+    index = 0
+    for partial in partials:
+        if abs(value) < abs(partial):
+            value, partial = partial, value
+        high = value + partial
+        low = partial - (high - value)
+        if low:
+            partials[index] = low
+            index += 1
+        value = high
+    partials[index:] = [value]
+    return partials
+
+
+class SumAggregator(Aggregator[list[float]]):
+    """Exact sum, doesn't depend on the order of values."""
+
+    def init(self):
+        return []
+
+    def update(self, state, value, order=None):
+        return _add_exact(state, value)
+
+    def merge(self, state, other):
+        for partial in other:
+            _add_exact(state, partial)
+        return state
+
+    def finalize(self, state):
+        return math.fsum(state)
+
+
+class AvgAggregator(Aggregator[tuple[int, list[float]]]):
+    def init(self):
+        return 0, []
+
+    def update(self, state, value, order=None):
+        count, partials = state
+        return count + 1, _add_exact(partials, value)
+
+    def merge(self, state, other):
+        count, partials = state
+        for partial in other[1]:
+            _add_exact(partials, partial)
+        return count + other[0], partials
+
+    def finalize(self, state):
+        count, partials = state
+        if not count:
+            return 0
+        return math.fsum(partials) / count
+
+    def load(self, data):
+        count, partials = data
+        return count, partials
+
+
+class CountAggregator(Aggregator[int]):
+    def init(self):
+        return 0
+
+    def update(self, state, value, order=None):
+        return state + 1
+
+    def merge(self, state, other):
+        return state + other
+
+    def finalize(self, state):
+        return state
+
+
+class ExtremumAggregator(Aggregator[float | None]):
+    def __init__(self, fn):
+        self.fn = fn  # max or min
+
+    def init(self):
+        return None
+
+    def update(self, state, value, order=None):
+        if state is None:
+            return value
+        return self.fn(state, value)
+
+    def merge(self, state, other):
+        if state is None or other is None:
+            return other if state is None else state
+        return self.fn(state, other)
+
+    def finalize(self, state):
+        # no values aggregate to 0, as AVG always did
+        return 0 if state is None else state
+
+
+class LastAggregator(Aggregator[tuple[Any, float] | None]):
+    def init(self):
+        return None
+
+    def update(self, state, value, order=None):
+        return self.merge(state, (order, value))
+
+    def merge(self, state, other):
+        if state is None or other is None:
+            return other if state is None else state
+        if other[0] is None or state[0] is None or other[0] >= state[0]:
+            return other
+        return state
+
+    def finalize(self, state):
+        return 0 if state is None else state[1]
+
+    def load(self, data):
+        if data is None:
+            return None
+        order, value = data
+        return _freeze(order), value
+
+
+class PercentileAggregator(Aggregator[LogSketch]):
+    """
+    Approximate, the result is within the relative accuracy of
+    `LogSketch` from the exact percentile.
+    """
+
+    def __init__(self, percentile: float):
+        if not 0 <= percentile <= 100:
+            raise ValueError("Percentile must be in [0, 100]")
+        self.percentile = percentile
+
+    def init(self):
+        return LogSketch()
+
+    def update(self, state, value, order=None):
+        state.add(value)
+        return state
+
+    def merge(self, state, other):
+        state.merge(other)
+        return state
+
+    def finalize(self, state):
+        result = state.quantile(self.percentile / 100)
+        return 0 if result is None else result
+
+    def dump(self, state):
+        return [list(i) for i in state.buckets()]
+
+    def load(self, data):
+        return LogSketch.from_buckets(data)
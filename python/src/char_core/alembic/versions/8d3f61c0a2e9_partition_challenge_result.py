@@ -0,0 +1,100 @@
+"""partition challenge_result
+
+Revision ID: 8d3f61c0a2e9
+Revises: 5a0c2e7d91b4
+Create Date: 2026-10-19 11:02:17.904411
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3f61c0a2e9'
+down_revision: Union[str, None] = '5a0c2e7d91b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# frozen copy of char_core.partitioning.CHALLENGE_RESULT_PARTITION_SIZE
+PARTITION_SIZE = 1000
+
+COLUMNS = (
+    "id, member_id, submitted_value, estimation_value, "
+    "verification_value, created_at, rolled_up_at"
+)
+
+
+def upgrade() -> None:
+    op.rename_table('challenge_result', 'challenge_result_heap')
+    op.execute("alter table challenge_result_heap "
+               "rename constraint challenge_result_pkey "
+               "to challenge_result_heap_pkey")
+    op.execute("alter sequence challenge_result_id_seq owned by none")
+
+    op.create_table('challenge_result',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('challenge_result_id_seq'::regclass)"), nullable=False),
+    sa.Column('member_id', sa.Integer(), nullable=False),
+    sa.Column('challenge_id', sa.Integer(), nullable=False),
+    sa.Column('submitted_value', sa.Float(), nullable=False),
+    sa.Column('estimation_value', sa.Float(), nullable=True),
+    sa.Column('verification_value', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('rolled_up_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['challenge_id'], ['challenge.id'], ),
+    sa.ForeignKeyConstraint(['member_id'], ['challenge_member.id'], ),
+    sa.PrimaryKeyConstraint('id', 'challenge_id'),
+    postgresql_partition_by='RANGE (challenge_id)'
+    )
+    op.execute("alter sequence challenge_result_id_seq "
+               "owned by challenge_result.id")
+
+    max_challenge_id = op.get_bind().scalar(
+        sa.text("select coalesce(max(id), 0) from challenge")
+    )
+    for index in range(max_challenge_id // PARTITION_SIZE + 2):
+        op.execute(
+            f"create table challenge_result_p{index} "
+            f"partition of challenge_result "
+            f"for values from ({index * PARTITION_SIZE}) "
+            f"to ({(index + 1) * PARTITION_SIZE})"
+        )
+
+    op.execute(
+        f"insert into challenge_result ({COLUMNS}, challenge_id) "
+        f"select {', '.join(f'r.{i.strip()}' for i in COLUMNS.split(','))}, "
+        f"m.challenge_id "
+        f"from challenge_result_heap r "
+        f"join challenge_member m on m.id = r.member_id"
+    )
+    op.drop_table('challenge_result_heap')
+
+
+def downgrade() -> None:
+    op.rename_table('challenge_result', 'challenge_result_partitioned')
+    op.execute("alter table challenge_result_partitioned "
+               "rename constraint challenge_result_pkey "
+               "to challenge_result_partitioned_pkey")
+    op.execute("alter sequence challenge_result_id_seq owned by none")
+
+    op.create_table('challenge_result',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('challenge_result_id_seq'::regclass)"), nullable=False),
+    sa.Column('member_id', sa.Integer(), nullable=False),
+    sa.Column('submitted_value', sa.Float(), nullable=False),
+    sa.Column('estimation_value', sa.Float(), nullable=True),
+    sa.Column('verification_value', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('rolled_up_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['member_id'], ['challenge_member.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("alter sequence challenge_result_id_seq "
+               "owned by challenge_result.id")
+
+    # note: results of detached partitions are not restored
+    op.execute(
+        f"insert into challenge_result ({COLUMNS}) "
+        f"select {COLUMNS} from challenge_result_partitioned"
+    )
+    op.drop_table('challenge_result_partitioned')
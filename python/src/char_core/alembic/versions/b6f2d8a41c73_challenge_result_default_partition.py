@@ -0,0 +1,39 @@
+"""challenge_result default partition
+
+Revision ID: b6f2d8a41c73
+Revises: 8a2d6e1f4c97
+Create Date: 2026-10-21 09:27:51.120385
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6f2d8a41c73'
+down_revision: Union[str, None] = '8a2d6e1f4c97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # results of challenges past the created partitions, see
+    # char_core.partitioning
+    op.execute(
+        "create table challenge_result_default "
+        "partition of challenge_result default"
+    )
+
+
+def downgrade() -> None:
+    count = op.get_bind().scalar(
+        sa.text("select count(*) from challenge_result_default")
+    )
+    if count:
+        raise RuntimeError(
+            "challenge_result_default has results, "
+            "create partitions for them first",
+        )
+    op.drop_table('challenge_result_default')
@@ -0,0 +1,79 @@
+"""user statistics
+
+Revision ID: c6a1f3e8b274
+Revises: 2e8c4f6b1d39
+Create Date: 2026-10-19 17:05:33.916482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a1f3e8b274'
+down_revision: Union[str, None] = '2e8c4f6b1d39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # prize functions selecting lower results are kept in sync with
+    # SelectionFnEnum.is_ascending
+    op.execute("""
+        create materialized view user_statistics as
+        with memberships as (
+            select user_id,
+                   count(*) filter (where is_participant) as challenges_count,
+                   count(*) filter (where is_winner) as wins_count
+            from challenge_member
+            group by user_id
+        ), places as (
+            select user_id, min(place) as best_place
+            from (
+                select challenge_member.user_id,
+                       rank() over (
+                           partition by challenge_member.challenge_id
+                           order by case
+                               when challenge.prize_determination_fn
+                                    in ('LESS_THAN', 'HEAD')
+                               then challenge_member.cached_aggregated_result
+                               else -challenge_member.cached_aggregated_result
+                           end
+                       ) as place
+                from challenge_member
+                join challenge on challenge.id = challenge_member.challenge_id
+                where challenge_member.is_participant
+                  and challenge.finalized_at is not null
+            ) as ranked
+            group by user_id
+        ), achievements as (
+            select user_id, count(*) as achievements_count
+            from achievement_assignation
+            group by user_id
+        ), spaces as (
+            select user_id, count(*) as spaces_count
+            from space_member
+            group by user_id
+        )
+        select "user".id as user_id,
+               coalesce(memberships.challenges_count, 0) as challenges_count,
+               coalesce(memberships.wins_count, 0) as wins_count,
+               coalesce(achievements.achievements_count, 0) as achievements_count,
+               coalesce(spaces.spaces_count, 0) as spaces_count,
+               places.best_place::integer as best_place,
+               localtimestamp as refreshed_at
+        from "user"
+        left join memberships on memberships.user_id = "user".id
+        left join places on places.user_id = "user".id
+        left join achievements on achievements.user_id = "user".id
+        left join spaces on spaces.user_id = "user".id
+    """)
+    # required by concurrent refresh
+    op.create_index('ix_user_statistics_user_id', 'user_statistics', ['user_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_statistics_user_id', table_name='user_statistics')
+    op.execute("drop materialized view user_statistics")
@@ -9,3 +9,11 @@ class AccessDenied(HTTPException):
             status_code=403,
             detail="Access denied",
         )
+
+
+class InvalidArgument(HTTPException):
+    def __init__(self, detail: str):
+        super().__init__(
+            status_code=422,
+            detail=detail,
+        )
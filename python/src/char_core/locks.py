@@ -0,0 +1,84 @@
+"""
+Postgres advisory locks coordinating processes working with the same
+database, e.g. replicas of `char-daemon`.
+
+Locks are keyed by (namespace, id) pairs, so they don't collide with
+locks of other applications using two int keys with other namespaces.
+"""
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+CHALLENGE_LOCK_NAMESPACE = 0x43484152  # "CHAR"
+PARTITIONS_LOCK_NAMESPACE = 0x43484153
+STATISTICS_LOCK_NAMESPACE = 0x43484154
+
+
+async def lock_partitions(session: AsyncSession):
+    """Serialize creation of partitions until the end of transaction."""
+    await session.execute(
+        select(func.pg_advisory_xact_lock(PARTITIONS_LOCK_NAMESPACE, 0))
+    )
+
+
+async def lock_challenge(
+        session: AsyncSession,
+        challenge_id: int,
+        wait: bool = True,
+) -> bool:
+    """
+    Lock the challenge until the end of transaction.  Reentrant, also
+    succeeds if the connection holds the lock of `challenge_session`.
+    :return: False if `wait` is False and the lock is held by another
+     transaction
+    """
+    if wait:
+        fn = func.pg_advisory_xact_lock
+    else:
+        fn = func.pg_try_advisory_xact_lock
+    is_locked = await session.scalar(
+        select(fn(CHALLENGE_LOCK_NAMESPACE, challenge_id)),
+    )
+    # pg_advisory_xact_lock returns void
+    return is_locked is not False
+
+
+@asynccontextmanager
+async def challenge_session(
+        engine: AsyncEngine,
+        challenge_id: int,
+) -> AsyncIterator[AsyncSession | None]:
+    """
+    Session holding the lock of the challenge for its whole lifetime,
+    or None if the challenge is locked by another process.
+
+    The lock is session level, so the session is bound to the dedicated
+    connection and may commit any number of times.  It is released on
+    exit, or by Postgres when the connection of the dead process is
+    closed.
+    """
+    async with engine.connect() as connection:
+        is_locked = await connection.scalar(select(
+            func.pg_try_advisory_lock(CHALLENGE_LOCK_NAMESPACE, challenge_id),
+        ))
+        await connection.commit()
+        if not is_locked:
+            yield None
+            return
+
+        try:
+            async with AsyncSession(
+                bind=connection,
+                expire_on_commit=False,
+            ) as session:
+                yield session
+        finally:
+            await connection.rollback()
+            await connection.execute(select(
+                func.pg_advisory_unlock(CHALLENGE_LOCK_NAMESPACE, challenge_id),
+            ))
+            await connection.commit()
@@ -1,27 +1,295 @@
 import asyncio
+import traceback
+from datetime import timedelta, datetime
 
-from dishka import make_async_container, Scope
+from dishka import make_async_container, Scope, AsyncContainer
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+from sqlalchemy.orm import raiseload
 
+from char_core.locks import challenge_session
+from char_core.metrics import REGISTRY, start_metrics_server
 from char_core.models import Challenge
-from char_rest_api.infrastructure import InfrastructureProvider
+from char_core.models.statistics import refresh_user_statistics
+from char_core.notifications import CHALLENGE_CHANGED_CHANNEL, listen
+from char_core.partitioning import ensure_result_partitions
+from char_core.scheduling import DeadlineScheduler
+from char_rest_api.infrastructure import InfrastructureProvider, DaemonConfig
 
+DEADLINE_LAG = REGISTRY.histogram(
+    "char_daemon_deadline_lag_seconds",
+    "Delay of lifecycle transitions after starts_at or ends_at_const.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, 60),
+)
+# attempts to process the challenge locked by a sweep at its deadline
+DEADLINE_LOCK_ATTEMPTS = 100
+DEADLINE_LOCK_RETRY_SECONDS = 0.05
+
+# strong references to fire and forget tasks
+_background_tasks = set()
+
+
+def _spawn(coroutine):
+    task = asyncio.create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def claim_challenges(
+        session: AsyncSession,
+        limit: int,
+        period: timedelta,
+) -> list[int]:
+    """
+    Lease not finalized challenges which were not checked by any replica
+    of the daemon within `period`.  Rows locked by concurrent claims
+    are skipped, so replicas split challenges between them.  Challenges
+    claimed by a dead replica are claimed again when the lease expires.
+    """
+    now = func.localtimestamp()
+    candidates = (
+        select(Challenge.id)
+        .where(Challenge.finalized_at.is_(None))
+        .where(or_(Challenge.lifecycle_checked_at.is_(None),
+                   Challenge.lifecycle_checked_at < now - period))
+        .order_by(Challenge.lifecycle_checked_at.nulls_first())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(Challenge)
+        .where(Challenge.id.in_(candidates.scalar_subquery()))
+        .values(lifecycle_checked_at=now)
+        .returning(Challenge.id)
+        .execution_options(synchronize_session=False)
+    )
+    challenge_ids = list(await session.scalars(stmt))
+    await session.commit()
+    return challenge_ids
+
+
+async def process_challenge(engine: AsyncEngine, challenge_id: int) -> bool:
+    """
+    :return: False if the challenge is being processed by another worker
+     or replica
+    """
+    # short session per challenge, so the identity map does not grow
+    # over the sweep
+    async with challenge_session(engine, challenge_id) as session:
+        if session is None:
+            return False
+        # lifecycle updates claim new results instead of loading them
+        challenge = await session.get(
+            Challenge,
+            challenge_id,
+            options=[raiseload(Challenge.results)],
+        )
+        if challenge is None:
+            return True
+        await challenge.update_lifecycle_state(
+            session=session,
+        )
+        return True
+
+
+async def claim_deadline(
+        session: AsyncSession,
+        challenge_id: int,
+        deadline: datetime,
+) -> bool:
+    """
+    Lease the challenge for its transition at the deadline.  Replicas
+    all fire every deadline, but only the first one gets the lease:
+    others see the challenge checked after the deadline (also when it
+    was claimed by a sweep since) and skip it.
+    """
+    stmt = (
+        update(Challenge)
+        .where(Challenge.id == challenge_id)
+        .where(Challenge.finalized_at.is_(None))
+        .where(or_(Challenge.lifecycle_checked_at.is_(None),
+                   Challenge.lifecycle_checked_at < deadline))
+        .values(lifecycle_checked_at=func.greatest(
+            func.localtimestamp(),
+            deadline,
+        ))
+        .returning(Challenge.id)
+        .execution_options(synchronize_session=False)
+    )
+    claimed = await session.scalar(stmt) is not None
+    await session.commit()
+    return claimed
+
+
+async def release_challenge(session: AsyncSession, challenge_id: int):
+    """Drop the lease, so the next sweep of any replica claims it first."""
+    await session.execute(
+        update(Challenge)
+        .where(Challenge.id == challenge_id)
+        .values(lifecycle_checked_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+
+
+async def process_deadline(
+        engine: AsyncEngine,
+        challenge_id: int,
+        deadline: datetime,
+):
+    try:
+        async with AsyncSession(bind=engine) as session:
+            if not await claim_deadline(session, challenge_id, deadline):
+                return  # fired by another replica
+        for _ in range(DEADLINE_LOCK_ATTEMPTS):
+            if await process_challenge(engine, challenge_id):
+                lag = datetime.now() - deadline
+                DEADLINE_LAG.observe(lag.total_seconds())
+                return
+            await asyncio.sleep(DEADLINE_LOCK_RETRY_SECONDS)
+    except Exception:
+        print(f"[daemon]: failed to process deadline of {challenge_id}")
+        print(traceback.format_exc())
+
+    # failed or still locked, requeue into sweeps
+    try:
+        async with AsyncSession(bind=engine) as session:
+            await release_challenge(session, challenge_id)
+    except Exception:
+        # the lease expires anyway
+        print(f"[daemon]: failed to requeue challenge {challenge_id}")
+        print(traceback.format_exc())
+
+
+async def fire_deadlines(engine: AsyncEngine, scheduler: DeadlineScheduler):
+    async for challenge_id, deadline in scheduler.due():
+        # not through the queue of workers, which may be busy with sweep
+        _spawn(process_deadline(engine, challenge_id, deadline))
+
+
+async def reload_deadlines(
+        engine: AsyncEngine,
+        scheduler: DeadlineScheduler,
+        challenge_id: int | None = None,
+):
+    async with AsyncSession(bind=engine) as session:
+        await scheduler.load(session, challenge_id)
+
+
+async def listen_challenges(
+        engine: AsyncEngine,
+        scheduler: DeadlineScheduler,
+):
+    """Keep deadlines in sync with created and edited challenges."""
+    def on_notification(payload: str):
+        _spawn(reload_deadlines(engine, scheduler, int(payload)))
 
-async def daemon():
     while True:
-        print("[daemon]: new iteration")
+        disconnected = asyncio.Event()
+        try:
+            async with listen(
+                    engine=engine,
+                    channels=(CHALLENGE_CHANGED_CHANNEL,),
+                    callback=on_notification,
+                    on_disconnect=disconnected.set,
+            ):
+                # loaded after LISTEN, so no change is missed
+                await reload_deadlines(engine, scheduler)
+                await disconnected.wait()
+        except Exception:
+            print("[daemon]: listener of challenges failed")
+            print(traceback.format_exc())
         await asyncio.sleep(1)
-        dependency_providers = (InfrastructureProvider(),)
-        container = make_async_container(*dependency_providers)
-        async with container(scope=Scope.REQUEST) as container:
-            session = await container.get(AsyncSession)
-            stmt = select(Challenge)
-            for challenge in await session.scalars(stmt):
-                await challenge.update_lifecycle_state(
-                    session=session,
-                )
+
+
+async def worker(engine: AsyncEngine, queue: asyncio.Queue):
+    while True:
+        challenge_id = await queue.get()
+        try:
+            await process_challenge(engine, challenge_id)
+        except Exception:
+            print(f"[daemon]: failed to process challenge {challenge_id}")
+            print(traceback.format_exc())
+        finally:
+            queue.task_done()
+
+
+async def refresh_statistics(engine: AsyncEngine, config: DaemonConfig):
+    while True:
+        await asyncio.sleep(config.user_statistics_refresh_seconds)
+        try:
+            async with AsyncSession(bind=engine) as session:
+                # skipped while another replica refreshes
+                await refresh_user_statistics(session)
+                await session.commit()
+        except Exception:
+            print("[daemon]: failed to refresh user statistics")
+            print(traceback.format_exc())
+
+
+async def sweep(
+        container: AsyncContainer,
+        config: DaemonConfig,
+        queue: asyncio.Queue,
+):
+    async with container(scope=Scope.REQUEST) as request_container:
+        session = await request_container.get(AsyncSession)
+        await ensure_result_partitions(session)
+        await session.commit()
+
+        # leases expire after `interval_seconds` even while queued, so
+        # an unbounded sweep would claim its own challenges again and
+        # never end.  the rest is claimed by the next sweep
+        max_claims = config.claim_batch_size * config.concurrency
+        claims = 0
+        queued = set()
+        while claims < max_claims:
+            challenge_ids = await claim_challenges(
+                session=session,
+                limit=min(config.claim_batch_size, max_claims - claims),
+                period=timedelta(seconds=config.interval_seconds),
+            )
+            claims += len(challenge_ids)
+            # the queue is bounded, so claims go as fast as workers
+            for challenge_id in challenge_ids:
+                if challenge_id in queued:
+                    continue  # lease expired while in the queue
+                queued.add(challenge_id)
+                await queue.put(challenge_id)
+            if len(challenge_ids) < config.claim_batch_size:
+                break
+
+    await queue.join()
+
+
+async def daemon():
+    dependency_providers = (InfrastructureProvider(),)
+    container = make_async_container(*dependency_providers)
+    config = await container.get(DaemonConfig)
+    engine = await container.get(AsyncEngine)
+
+    if config.metrics_port is not None:
+        await start_metrics_server(config.metrics_port)
+
+    scheduler = DeadlineScheduler()
+    queue = asyncio.Queue(maxsize=config.concurrency)
+    workers = [
+        asyncio.create_task(worker(engine, queue))
+        for _ in range(config.concurrency)
+    ]
+    workers.append(asyncio.create_task(listen_challenges(engine, scheduler)))
+    workers.append(asyncio.create_task(fire_deadlines(engine, scheduler)))
+    workers.append(asyncio.create_task(refresh_statistics(engine, config)))
+    try:
+        while True:
+            print("[daemon]: new iteration")
+            await sweep(container, config, queue)
+            await asyncio.sleep(config.interval_seconds)
+    finally:
+        for task in workers:
+            task.cancel()
+        await container.close()
 
 
 def main():
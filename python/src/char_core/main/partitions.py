@@ -0,0 +1,62 @@
+import argparse
+import asyncio
+
+from dishka import make_async_container, Scope
+
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+
+from char_core.partitioning import (
+    CHALLENGE_RESULT_PARTITIONS_AHEAD,
+    ensure_result_partitions,
+    detach_result_partition,
+    get_result_partitions,
+)
+from char_rest_api.infrastructure import InfrastructureProvider
+
+
+async def partitions(args: argparse.Namespace):
+    dependency_providers = (InfrastructureProvider(),)
+    container = make_async_container(*dependency_providers)
+    try:
+        if args.command == "detach":
+            engine = await container.get(AsyncEngine)
+            await detach_result_partition(
+                engine=engine,
+                index=args.index,
+                tablespace=args.tablespace,
+            )
+            return
+
+        async with container(scope=Scope.REQUEST) as request_container:
+            session = await request_container.get(AsyncSession)
+            if args.command == "ensure":
+                created = await ensure_result_partitions(
+                    session=session,
+                    ahead=args.ahead,
+                )
+                await session.commit()
+                print("created:", *created)
+            else:
+                print(*await get_result_partitions(session), sep="\n")
+    finally:
+        await container.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="char-partitions",
+        description="Manage partitions of challenge results.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list")
+    ensure_parser = subparsers.add_parser("ensure")
+    ensure_parser.add_argument(
+        "--ahead",
+        type=int,
+        default=CHALLENGE_RESULT_PARTITIONS_AHEAD,
+    )
+    detach_parser = subparsers.add_parser("detach")
+    detach_parser.add_argument("index", type=int)
+    detach_parser.add_argument("--tablespace", default=None)
+
+    asyncio.run(partitions(parser.parse_args()))
@@ -1,4 +1,7 @@
 from .base import *
 from .user import *
 from .space import *
+from .history import *
 from .challenge import *
+from .statistics import *
+from .rate_limit import *
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import TypeAlias, Annotated
+from typing import TypeAlias, Annotated, Iterable
 
+from sqlalchemy import any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, mapped_column
 
@@ -19,3 +21,15 @@ IntegerPk: TypeAlias = Annotated[
     int,
     mapped_column(primary_key=True, autoincrement=True),
 ]
+
+
+def any_of(column, values: Iterable):
+    """
+    Same as `column.in_(values)`, but values are bound as a single array
+    parameter, so there is no limit on count of values.
+    """
+    return column == any_(bindparam(
+        None,
+        list(values),
+        type_=ARRAY(column.type),
+    ))
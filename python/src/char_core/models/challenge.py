@@ -1,31 +1,55 @@
 from __future__ import annotations
 
+import zlib
 from datetime import datetime
 from enum import Enum
-from typing import TYPE_CHECKING, Iterable, TypeVar
+from typing import TYPE_CHECKING, Any
 
 from sqlalchemy import (
+    JSON,
     ForeignKey,
     CheckConstraint,
     case,
+    delete,
     func,
     UniqueConstraint,
+    select,
+    update,
+    literal,
+    Index,
+    or_,
+    text,
 )
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import (
+    Mapped,
+    mapped_column,
+    relationship,
+    declared_attr,
+    validates,
+)
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from char_core.aggregation import Aggregator
 from char_core.exceptions import AccessDenied
-from char_core.models.base import Base, IntegerPk, CreatedAt
+from char_core.locks import lock_challenge
+from char_core.notifications import notify_challenge_updated
+from char_core.models.base import Base, IntegerPk, CreatedAt, any_of
+from char_core.models.history import (
+    rebuild_rollups,
+    rollup_results,
+    snapshot_progress,
+)
 from char_core.models.user import User
+from char_core.strategies import AggregationStrategy, SelectionFnEnum
 
 if TYPE_CHECKING:
     from char_core.models.space import Space
 
 
-_T = TypeVar("_T")
-
-
 class ChallengeMemberRoleEnum(Enum):
     ANY = "ANY"
     REFREE = "REFREE"
@@ -33,66 +57,16 @@ class ChallengeMemberRoleEnum(Enum):
     ADMINISTRATOR = "ADMINISTRATOR"
 
 
-class AggregationStrategy(Enum):
-    SUM = "SUM"
-    AVG = "AVG"
-    MAX = "MAX"
-    MIN = "MIN"
-
-    def evaluate(self, values: list[float]) -> float:
-        if self is AggregationStrategy.AVG:
-            if not len(values):
-                return 0
-            return sum(values) / len(values)
-        elif self is AggregationStrategy.SUM:
-            return sum(values)
-        elif self is AggregationStrategy.MAX:
-            return max(values)
-        elif self is AggregationStrategy.MIN:
-            return min(values)
-        else:
-            raise NotImplementedError(self)
-
-
-class SelectionFnEnum(Enum):
-    HIGHER_THAN = "HIGHER_THAN"
-    LESS_THAN = "LESS_THAN"
-    HEAD = "HEAD"
-    TAIL = "TAIL"
-
-    def evaluate(
-            self,
-            values: dict[_T, float],
-            argument: float,
-    ) -> Iterable[_T]:
-        # todo: write tests for this stuff
-        if self is SelectionFnEnum.HIGHER_THAN:
-            return {k: v for k, v in values.items() if v > argument}
-        elif self is SelectionFnEnum.LESS_THAN:
-            return {k: v for k, v in values.items() if v < argument}
-        elif self in (SelectionFnEnum.HEAD, SelectionFnEnum.TAIL):
-            orderred = values.items()
-            orderred = sorted(orderred, key=lambda x: x[1])
-            if self is SelectionFnEnum.HEAD:
-                return dict(orderred[:int(argument)])
-            else:
-                return dict(reversed(orderred)[:int(argument)])
-        else:
-            raise NotImplementedError(self)
+class ReviewKindEnum(Enum):
+    ESTIMATION = "ESTIMATION"  # by refree
+    VERIFICATION = "VERIFICATION"  # by administrator
 
-    def evaluate_progress(
-            self,
-            values: list[float],
-            argument: float,
-    ):
-        if self is SelectionFnEnum.HIGHER_THAN:
-            # assumption: start value is 0
-            # todo: cover all such progress logic
-            numerator = AggregationStrategy.AVG.evaluate(values)
-            denominator = argument
-            if denominator == 0:
-                return 34  # todo: remember and pray :)
-            return numerator / denominator * 100
+    @property
+    def column_name(self) -> str:
+        if self is ReviewKindEnum.ESTIMATION:
+            return "estimation_value"
+        elif self is ReviewKindEnum.VERIFICATION:
+            return "verification_value"
         else:
             raise NotImplementedError(self)
 
@@ -101,13 +75,54 @@ class ChallengeResult(Base):
     __tablename__ = "challenge_result"
 
     id: Mapped[IntegerPk]
-    member_id: Mapped[int] = mapped_column(ForeignKey("challenge_member.id"))
+    member_id: Mapped[int] = mapped_column(
+        ForeignKey("challenge_member.id"),
+        index=True,
+    )
+    # partition key, see char_core.partitioning
+    challenge_id: Mapped[int] = mapped_column(
+        ForeignKey("challenge.id"),
+        primary_key=True,
+    )
     submitted_value: Mapped[float]  # assigned by submitter
     estimation_value: Mapped[float | None]  # may be assigned by refree
     verification_value: Mapped[float | None]  # may be assigned by administrator
     created_at: Mapped[CreatedAt]
+    rolled_up_at: Mapped[datetime | None]  # folded into history rollups
 
     member: Mapped[ChallengeMember] = relationship()
+    challenge: Mapped[Challenge] = relationship()
+
+    __table_args__ = (
+        # review queues, see `ReviewKindEnum`
+        Index(
+            "ix_challenge_result_pending_estimation",
+            "challenge_id",
+            "id",
+            postgresql_where=text("estimation_value is null"),
+        ),
+        Index(
+            "ix_challenge_result_pending_verification",
+            "challenge_id",
+            "id",
+            postgresql_where=text("verification_value is null"),
+        ),
+        {"postgresql_partition_by": "RANGE (challenge_id)"},
+    )
+
+    @declared_attr.directive
+    def __mapper_args__(cls):
+        # postgres requires partition key to be a part of the primary key,
+        # but id is unique by itself, so keep identity by id only
+        return {"primary_key": [cls.__table__.c.id]}
+
+    @validates("member")
+    def _validate_member(self, key, member: ChallengeMember):
+        if member.challenge_id is not None:
+            self.challenge_id = member.challenge_id
+        elif member.challenge is not None:  # not flushed yet
+            self.challenge = member.challenge
+        return member
 
     def __str__(self):
         result = f"{self.submitted_value}"
@@ -124,8 +139,17 @@ class ChallengeMember(Base):
 
     id: Mapped[IntegerPk]
     user_id: Mapped[int] = mapped_column(ForeignKey("user.id"))
-    challenge_id: Mapped[int] = mapped_column(ForeignKey("challenge.id"))
+    challenge_id: Mapped[int] = mapped_column(
+        ForeignKey("challenge.id"),
+        index=True,
+    )
     cached_aggregated_result: Mapped[float] = mapped_column(default=0)
+    # of the aggregator of the challenge over folded results, None when
+    # there are none, see `Challenge._get_aggregated_results`
+    aggregation_state: Mapped[Any] = mapped_column(
+        JSON(none_as_null=True),
+        nullable=True,
+    )
     is_referee: Mapped[bool] = mapped_column(default=False)
     is_participant: Mapped[bool] = mapped_column(default=False)
     is_administrator: Mapped[bool] = mapped_column(default=False)
@@ -141,12 +165,69 @@ class ChallengeMember(Base):
             "user_id",
             "challenge_id",
         ),
+        # standings and ranks of participants
+        Index(
+            "ix_challenge_member_standings",
+            "challenge_id",
+            "cached_aggregated_result",
+            postgresql_where=text("is_participant"),
+        ),
     )
     # results: Mapped[list[ChallengeResult]] = relationship(
     #     secondary=lambda: Challenge.__table__,
     #     viewonly=True,
     # )
 
+    def ensure_roles(
+            self,
+            administrator: bool = False,
+            participant: bool = False,
+            refree: bool = False,
+    ):
+        is_valid = True
+
+        if administrator and not self.is_administrator:
+            is_valid = False
+        if participant and not self.is_participant:
+            is_valid = False
+        if refree and not self.is_referee:
+            is_valid = False
+
+        if not is_valid:
+            raise AccessDenied()
+
+    @classmethod
+    async def ensure_access(
+            cls,
+            session: AsyncSession,
+            user: User,
+            challenge_id: int,
+            space_id: int,
+            administrator: bool = False,
+            participant: bool = False,
+            refree: bool = False,
+    ) -> ChallengeMember:
+        """
+        Same as `Challenge.ensure_member_access`, but without loading
+        the challenge (and so all of its members and results).
+        """
+        stmt = (
+            select(cls)
+            .join(Challenge, Challenge.id == cls.challenge_id)
+            .where(cls.challenge_id == challenge_id)
+            .where(cls.user_id == user.id)
+            .where(Challenge.space_id == space_id)
+        )
+        member = await session.scalar(stmt)
+        if member is None:
+            raise AccessDenied()
+        member.ensure_roles(
+            administrator=administrator,
+            participant=participant,
+            refree=refree,
+        )
+        return member
+
     def __str__(self):
         parts = []
         if self.is_administrator:
@@ -172,7 +253,10 @@ class Challenge(Base):
     __tablename__ = "challenge"
 
     id: Mapped[IntegerPk]
-    space_id: Mapped[int] = mapped_column(ForeignKey("space.id"))
+    space_id: Mapped[int] = mapped_column(
+        ForeignKey("space.id"),
+        index=True,
+    )
     name: Mapped[str]
     description: Mapped[str]
     prize: Mapped[str | None]
@@ -188,12 +272,21 @@ class Challenge(Base):
     ends_at_determination_argument: Mapped[float | None]
 
     cached_current_progress: Mapped[int] = mapped_column(default=0)
+    # maintained on joins, so ranks are computed without counting
+    # all participants
+    participants_count: Mapped[int] = mapped_column(default=0)
 
     results_aggregation_strategy: Mapped[AggregationStrategy]
+    results_aggregation_argument: Mapped[float | None]
+    # aggregation states of members must be rebuilt from all active
+    # results, e.g. after the strategy was changed
+    is_aggregation_stale: Mapped[bool] = mapped_column(default=True)
 
     prize_determination_fn: Mapped[SelectionFnEnum]
     prize_determination_argument: Mapped[float]
     finalized_at: Mapped[datetime | None]
+    # lease of the daemon replica which checked the lifecycle last
+    lifecycle_checked_at: Mapped[datetime | None]
 
     created_at: Mapped[CreatedAt]
 
@@ -202,9 +295,9 @@ class Challenge(Base):
         back_populates="challenge",
         lazy="selectin",
     )
+    # joined by the partition key, so the query touches one partition
     results: Mapped[list[ChallengeResult]] = relationship(
         lazy="selectin",
-        secondary=lambda: ChallengeMember.__table__,
         viewonly=True,
     )
     achievement: Mapped[Achievement] = relationship()
@@ -212,6 +305,11 @@ class Challenge(Base):
     __table_args__ = (
         CheckConstraint("cached_current_progress >= 0 "
                         "and cached_current_progress <= 100"),
+        Index(
+            "ix_challenge_lifecycle_checked_at",
+            "lifecycle_checked_at",
+            postgresql_where=text("finalized_at is null"),
+        ),
     )
 
     @hybrid_property
@@ -261,48 +359,178 @@ class Challenge(Base):
         if len(members) == 0:
             raise AccessDenied()
         member: ChallengeMember = members[0]
+        member.ensure_roles(
+            administrator=administrator,
+            participant=participant,
+            refree=refree,
+        )
+        return member
 
-        is_valid = True
-
-        if administrator and not member.is_administrator:
-            is_valid = False
-        if participant and not member.is_participant:
-            is_valid = False
-        if refree and not member.is_referee:
-            is_valid = False
+    def get_aggregator(self) -> Aggregator:
+        return self.results_aggregation_strategy.aggregator(
+            self.results_aggregation_argument,
+        )
 
-        if not is_valid:
-            raise AccessDenied()
+    def _get_result_value(self, result: ChallengeResult) -> float:
+        if self.is_estimation_required:
+            return result.estimation_value
+        else:
+            return result.submitted_value
+
+    def _select_active_results(self, stmt):
+        """Same as `active_results`, but as the condition of statement."""
+        stmt = stmt.where(ChallengeResult.challenge_id == self.id)
+        if self.is_estimation_required:
+            stmt = stmt.where(ChallengeResult.estimation_value.is_not(None))
+        if self.is_verification_required:
+            stmt = stmt.where(
+                ChallengeResult.verification_value.is_not(None),
+            )
+        return stmt
 
-        return member
+    def _result_entry_columns(self) -> tuple:
+        if self.is_estimation_required:
+            value = ChallengeResult.estimation_value
+        else:
+            value = ChallengeResult.submitted_value
+        return (
+            ChallengeResult.id,
+            ChallengeResult.member_id,
+            value.label("value"),
+            ChallengeResult.created_at,
+        )
 
-    async def _get_aggregated_results(
+    async def _claim_active_results(
             self,
             session: AsyncSession,
-    ) -> dict[ChallengeMember, float]:
-        all_results = dict()
-        for result in self.active_results:
-            member: ChallengeMember = await result.awaitable_attrs.member
-            all_results.setdefault(member, [])
+    ) -> list:
+        """
+        Claim results which became active since the last update and
+        fold them into rollups.  Claimed by a conditional update, so
+        concurrent lifecycle updates never fold the same result twice.
+        :return: (id, member_id, value, created_at) of claimed results
+        """
+        stmt = self._select_active_results(
+            update(ChallengeResult)
+            .where(ChallengeResult.rolled_up_at.is_(None))
+            .values(rolled_up_at=datetime.now())
+            .returning(*self._result_entry_columns())
+            .execution_options(synchronize_session=False)
+        )
+        claimed = list(await session.execute(stmt))
+        if not claimed:
+            return claimed
+
+        # members are updated with these results by the caller
+        await notify_challenge_updated(session, self.id)
+        await rollup_results(
+            session=session,
+            challenge_id=self.id,
+            entries=[(i.member_id, i.value, i.created_at) for i in claimed],
+        )
+        return claimed
 
-            if self.is_estimation_required:
-                value = result.estimation_value
-            else:
-                value = result.submitted_value
+    async def _release_inactive_results(self, session: AsyncSession):
+        """
+        Make folded results which are not active anymore (e.g. their
+        review was reset) claimable again, when they become active.
+        """
+        pending = []
+        if self.is_estimation_required:
+            pending.append(ChallengeResult.estimation_value.is_(None))
+        if self.is_verification_required:
+            pending.append(ChallengeResult.verification_value.is_(None))
+        if not pending:
+            return  # every result is active
+        await session.execute(
+            update(ChallengeResult)
+            .where(ChallengeResult.challenge_id == self.id)
+            .where(ChallengeResult.rolled_up_at.is_not(None))
+            .where(or_(*pending))
+            .values(rolled_up_at=None)
+            .execution_options(synchronize_session=False)
+        )
 
-            all_results[member].append(value)
+    @classmethod
+    async def recount_participants(
+            cls,
+            session: AsyncSession,
+            challenge_id: int,
+    ):
+        """Restore `participants_count`, e.g. after manual changes."""
+        participants = (
+            select(func.count())
+            .where(ChallengeMember.challenge_id == challenge_id)
+            .where(ChallengeMember.is_participant)
+            .scalar_subquery()
+        )
+        await session.execute(
+            update(cls)
+            .where(cls.id == challenge_id)
+            .values(participants_count=participants)
+            .execution_options(synchronize_session=False)
+        )
 
-        result = {
-            k: self.results_aggregation_strategy.evaluate(v)
-            for k, v in all_results.items()
-        }
+    async def _get_aggregated_results(
+            self,
+            session: AsyncSession,
+    ) -> dict[ChallengeMember, float]:
+        """
+        Fold newly active results into aggregation states of members,
+        so an update costs the number of new results, not of all of
+        them.  States are rebuilt from all active results only when
+        they are stale.
+        :return: aggregated results of members having active results,
+         ordered by member ids
+        """
+        aggregator = self.get_aggregator()
+        members = {i.id: i for i in await self.awaitable_attrs.members}
+
+        entries = await self._claim_active_results(session)
+        if self.is_aggregation_stale:
+            for member in members.values():
+                member.aggregation_state = None
+                member.cached_aggregated_result = 0
+            await self._release_inactive_results(session)
+            entries = list(await session.execute(self._select_active_results(
+                select(*self._result_entry_columns())
+            )))
+            # values of folded results may have been changed as well
+            await rebuild_rollups(
+                session=session,
+                challenge_id=self.id,
+                entries=[(i.member_id, i.value, i.created_at)
+                         for i in entries],
+            )
+            self.is_aggregation_stale = False
+
+        states = {}
+        for entry in entries:
+            state = states.get(entry.member_id)
+            if state is None:
+                data = members[entry.member_id].aggregation_state
+                if data is None:
+                    state = aggregator.init()
+                else:
+                    state = aggregator.load(data)
+            # the latest by creation, then by id
+            order = (entry.created_at.isoformat(timespec="microseconds"),
+                     entry.id)
+            states[entry.member_id] = aggregator.update(
+                state, entry.value, order=order)
 
         # update caches results that displays in rating
-        for member, aggregated_result in result.items():
-            member.cached_aggregated_result = aggregated_result
+        for member_id, state in states.items():
+            member = members[member_id]
+            member.aggregation_state = aggregator.dump(state)
+            member.cached_aggregated_result = aggregator.finalize(state)
         await session.flush()
 
-        return result
+        return {
+            member: member.cached_aggregated_result
+            for member_id, member in sorted(members.items())
+            if member.aggregation_state is not None
+        }
 
     async def _evaluate_is_finished(
             self,
@@ -311,11 +539,13 @@ class Challenge(Base):
         if self.ends_at_const is not None:
             return self.ends_at_const < datetime.now()
 
-        selected = self.ends_at_determination_fn.evaluate(
-            agg_results,
-            self.ends_at_determination_argument,
+        from char_core import scoring  # imports NumPy, see the module
+        selected = scoring.select(
+            fn=self.ends_at_determination_fn,
+            values=list(agg_results.values()),
+            argument=self.ends_at_determination_argument,
         )
-        return bool(selected)
+        return bool(len(selected))
 
     async def _sync_progress(
             self,
@@ -338,63 +568,222 @@ class Challenge(Base):
             session: AsyncSession,
             agg_results: dict[ChallengeMember, float],
     ):
-        # note: concurrent calls wouldn't lead to inconsistante state.
-        #  at least I don't see any reasons why it must, if to make
-        #  assumption that all reports if frozen. so keep in mind that
-        #  this code may be called concurrently, as the rest of code
-        #  uses this assumption.  for example, you can't just make
-        #  notification mailing here for this reason :)
+        # note: called under the lock of the challenge only, see
+        #  `update_lifecycle_state`.  finalization is conditional
+        #  anyway, so it happens exactly once even if the lock is
+        #  bypassed, and e.g. notification mailing may be done here.
+
+        finalized_at = datetime.now()
+        stmt = (
+            update(Challenge)
+            .where(Challenge.id == self.id)
+            .where(Challenge.finalized_at.is_(None))
+            .values(finalized_at=finalized_at)
+            .returning(Challenge.id)
+            .execution_options(synchronize_session=False)
+        )
+        if await session.scalar(stmt) is None:
+            return  # finalized concurrently
+        set_committed_value(self, "finalized_at", finalized_at)
+        await notify_challenge_updated(session, self.id)
+
+        from char_core import scoring  # imports NumPy, see the module
 
         self.cached_current_progress = 100
-        winners = self.prize_determination_fn.evaluate(
-            values=agg_results,
-            argument=self.prize_determination_argument,
+        members = list(agg_results)
+        winners = [
+            members[i]
+            for i in scoring.select(
+                fn=self.prize_determination_fn,
+                values=list(agg_results.values()),
+                argument=self.prize_determination_argument,
+            ).tolist()
+        ]
+        await session.flush()
+        # set based, as there may be thousands of winners
+        await session.execute(
+            update(ChallengeMember)
+            .where(any_of(ChallengeMember.id, [i.id for i in winners]))
+            .values(is_winner=True)
+        )
+        await self._assign_achievement(session)
+        await snapshot_progress(
+            session=session,
+            challenge_id=self.id,
+            progress=self.cached_current_progress,
+            moment=self.finalized_at,
         )
-        for member in winners:
-            member.is_winner = True
-        self.finalized_at = datetime.now()
-        await session.flush((self, *winners))
-        await session.commit()
+        # the snapshot is written by the first read of the finalized
+        # challenge, which serializes it anyway, see `write_snapshot`
 
-    async def update_lifecycle_state(
+    async def _assign_achievement(
+            self,
+            session: AsyncSession,
+    ):
+        if self.achievement_id is None:
+            return
+
+        table = AchievementAssignation.__table__
+        winners = (
+            select(
+                ChallengeMember.user_id,
+                ChallengeMember.challenge_id,
+                literal(self.achievement_id),
+                literal(datetime.now()),
+            )
+            .where(ChallengeMember.challenge_id == self.id)
+            .where(ChallengeMember.is_winner)
+        )
+        # idempotent, concurrent finalization assigns the achievement once
+        stmt = (
+            insert(table)
+            .from_select(
+                ["user_id", "challenge_id", "achievement_id", "created_at"],
+                winners,
+            )
+            .on_conflict_do_nothing(
+                index_elements=["user_id", "challenge_id", "achievement_id"],
+            )
+            .returning(table.c.user_id)
+        )
+        assigned_user_ids = set(await session.scalars(stmt))
+
+        # assignations of already loaded users are stale now,
+        # reload all of them at once
+        loaded_user_ids = [
+            i.id for i in session.identity_map.values()
+            if isinstance(i, User) and i.id in assigned_user_ids
+        ]
+        if loaded_user_ids:
+            stmt = (
+                select(User)
+                .where(any_of(User.id, loaded_user_ids))
+                .execution_options(populate_existing=True)
+            )
+            await session.scalars(stmt)
+
+    async def write_snapshot(
             self,
             session: AsyncSession,
+            content: bytes,
     ):
         """
-        Update lifecycle state of the challenge.
-        :return:
+        Freeze serialized representation of the finalized challenge,
+        so it may be served without loading members and results.
+
+        :param content: serialized by the caller, e.g. json of the
+         REST representation.  Data of users embedded into it stays as
+         of the moment of writing.
         """
+        assert self.finalized_at is not None
+        stmt = (
+            insert(ChallengeSnapshot)
+            .values(
+                challenge_id=self.id,
+                payload=ChallengeSnapshot.pack(content),
+                created_at=datetime.now(),
+            )
+            .on_conflict_do_nothing()
+        )
+        await session.execute(stmt)
 
-        await session.refresh(self)  # see challenge tests for explanition
+    @classmethod
+    async def discard_snapshot(
+            cls,
+            session: AsyncSession,
+            challenge_id: int,
+    ):
+        """
+        Drop the snapshot after manual changes of the finalized
+        challenge, the next read writes it again.
+        """
+        await session.execute(
+            delete(ChallengeSnapshot)
+            .where(ChallengeSnapshot.challenge_id == challenge_id)
+        )
 
-        if ChallengeStateEnum(self.state) is ChallengeStateEnum.SCHEDULED:
-            return
+    async def update_lifecycle_state(
+            self,
+            session: AsyncSession,
+            wait: bool = True,
+    ) -> bool:
+        """
+        Update lifecycle state of the challenge.
 
+        Runs in one transaction holding the lock of the challenge, so
+        concurrent updates (submission handlers, daemon replicas) are
+        serialized and caches are never overwritten by a computation
+        over stale results.
+        :param wait: if False, give up when the challenge is being
+         updated by someone else.  Results committed before are then
+         picked by that update or by the next sweep of the daemon.
+        :return: False if gave up
+        """
+        if not await lock_challenge(session, self.id, wait=wait):
+            await session.commit()  # nothing to save, keeps objects loaded
+            return False
+
+        # under the lock, so sees everything committed before.  results
+        # are not reloaded, newly active ones are claimed by the update
+        await session.refresh(self, attribute_names=[
+            *(i.key for i in sa_inspect(Challenge).column_attrs),
+            "members",
+        ])  # see challenge tests for explanition
+
+        agg_result = None
         if ChallengeStateEnum(self.state) is ChallengeStateEnum.ACTIVE:
+            previous_progress = self.cached_current_progress
             agg_result = await self._get_aggregated_results(
                 session=session,
             )
-            await session.commit()  # save updated cache
             await self._sync_progress(agg_result)
+            await snapshot_progress(
+                session=session,
+                challenge_id=self.id,
+                progress=self.cached_current_progress,
+                moment=datetime.now(),
+                previous_progress=previous_progress,
+            )
 
             # is enough circumstance, state here is already has value finished.
 
         if ChallengeStateEnum(self.state) is ChallengeStateEnum.FINISHED:
             if self.finalized_at is None:
-                agg_result = await self._get_aggregated_results(
-                    session=session,
-                )
-                await session.commit()  # save updated cache
+                if agg_result is None:
+                    agg_result = await self._get_aggregated_results(
+                        session=session,
+                    )
                 await self._finalize(
                     session=session,
                     agg_results=agg_result,
                 )
-            return
+
+        await session.commit()  # save caches and release the lock
+        return True
 
     def __str__(self):
         return self.name
 
 
+class ChallengeSnapshot(Base):
+    __tablename__ = "challenge_snapshot"
+
+    challenge_id: Mapped[int] = mapped_column(
+        ForeignKey("challenge.id"),
+        primary_key=True,
+    )
+    payload: Mapped[bytes]  # zlib compressed, see `Challenge.write_snapshot`
+    created_at: Mapped[CreatedAt]
+
+    @staticmethod
+    def pack(content: bytes) -> bytes:
+        return zlib.compress(content)
+
+    @staticmethod
+    def unpack(payload: bytes) -> bytes:
+        return zlib.decompress(payload)
+
+
 class Achievement(Base):
     __tablename__ = "achievement"
 
@@ -413,7 +802,10 @@ class AchievementAssignation(Base):
     __tablename__ = "achievement_assignation"
 
     id: Mapped[IntegerPk]
-    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"))
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("user.id"),
+        index=True,
+    )
     challenge_id: Mapped[int] = mapped_column(ForeignKey("challenge.id"))
     achievement_id: Mapped[int] = mapped_column(ForeignKey("achievement.id"))
     created_at: Mapped[CreatedAt]
@@ -421,3 +813,11 @@ class AchievementAssignation(Base):
     challenge: Mapped[Challenge] = relationship()
     user: Mapped[User] = relationship()
     achievement: Mapped[Achievement] = relationship(lazy="selectin")
+
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id",
+            "challenge_id",
+            "achievement_id",
+        ),
+    )
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+from datetime import datetime
+from enum import Enum
+from typing import Iterable
+
+from sqlalchemy import (
+    ForeignKey,
+    SmallInteger,
+    and_,
+    delete,
+    func,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from char_core.models.base import Base
+from char_core.sketches import LogSketch
+
+
+class RollupBucketEnum(Enum):
+    HOUR = "HOUR"
+    DAY = "DAY"
+
+    def truncate(self, moment: datetime) -> datetime:
+        if self is RollupBucketEnum.HOUR:
+            return moment.replace(minute=0, second=0, microsecond=0)
+        elif self is RollupBucketEnum.DAY:
+            return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        else:
+            raise NotImplementedError(self)
+
+
+class ChallengeMemberRollup(Base):
+    """
+    Active results of the member folded into time buckets.
+    Rows are only incremented, see `rollup_results`, until values
+    of folded results change, see `rebuild_rollups`.
+    """
+    __tablename__ = "challenge_member_rollup"
+
+    member_id: Mapped[int] = mapped_column(
+        ForeignKey("challenge_member.id"),
+        primary_key=True,
+    )
+    bucket: Mapped[RollupBucketEnum] = mapped_column(primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(primary_key=True)
+    challenge_id: Mapped[int] = mapped_column(
+        ForeignKey("challenge.id"),
+        index=True,
+    )
+    results_count: Mapped[int] = mapped_column(default=0)
+    values_sum: Mapped[float] = mapped_column(default=0)
+    values_min: Mapped[float | None]
+    values_max: Mapped[float | None]
+
+
+class ChallengeRollup(Base):
+    """
+    Active results of the whole challenge folded into time buckets,
+    with the last `cached_current_progress` observed within the bucket.
+    """
+    __tablename__ = "challenge_rollup"
+
+    challenge_id: Mapped[int] = mapped_column(
+        ForeignKey("challenge.id"),
+        primary_key=True,
+    )
+    bucket: Mapped[RollupBucketEnum] = mapped_column(primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(primary_key=True)
+    results_count: Mapped[int] = mapped_column(default=0)
+    values_sum: Mapped[float] = mapped_column(default=0)
+    values_min: Mapped[float | None]
+    values_max: Mapped[float | None]
+    progress: Mapped[int | None]
+
+
+class ChallengeValueBucket(Base):
+    """
+    Counts of active results of the challenge in buckets of
+    `LogSketch`, so the distribution of values is estimated without
+    loading results.  Rows are only incremented, as rollups are.
+    """
+    __tablename__ = "challenge_value_bucket"
+
+    challenge_id: Mapped[int] = mapped_column(
+        ForeignKey("challenge.id"),
+        primary_key=True,
+    )
+    sign: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    key: Mapped[int] = mapped_column(primary_key=True)
+    results_count: Mapped[int] = mapped_column(default=0)
+
+
+def _fold(
+        entries: Iterable[tuple[int, float, datetime]],
+) -> tuple[dict, dict]:
+    by_member = dict()
+    by_challenge = dict()
+    for member_id, value, created_at in entries:
+        for bucket in RollupBucketEnum:
+            bucket_start = bucket.truncate(created_at)
+            for key, target in (
+                    ((member_id, bucket, bucket_start), by_member),
+                    ((bucket, bucket_start), by_challenge),
+            ):
+                if key not in target:
+                    target[key] = [0, 0., value, value]
+                state = target[key]
+                state[0] += 1
+                state[1] += value
+                state[2] = min(state[2], value)
+                state[3] = max(state[3], value)
+    return by_member, by_challenge
+
+
+def _increment_on_conflict(model, stmt, index_elements: list[str]):
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_=dict(
+            results_count=model.results_count + stmt.excluded.results_count,
+            values_sum=model.values_sum + stmt.excluded.values_sum,
+            values_min=func.least(model.values_min, stmt.excluded.values_min),
+            values_max=func.greatest(model.values_max,
+                                     stmt.excluded.values_max),
+        ),
+    )
+
+
+async def rollup_results(
+        session: AsyncSession,
+        challenge_id: int,
+        entries: Iterable[tuple[int, float, datetime]],
+):
+    """
+    Fold newly activated results into hourly and daily rollups and into
+    the distribution sketch of the challenge.
+
+    :param entries: (member_id, value, created_at) of every result
+     that became active.  Caller is responsible for passing each
+     result exactly once, increments are not idempotent.
+    """
+    entries = list(entries)
+    by_member, by_challenge = _fold(entries)
+    if not by_member:
+        return
+
+    stmt = insert(ChallengeMemberRollup).values([
+        dict(
+            member_id=member_id,
+            bucket=bucket,
+            bucket_start=bucket_start,
+            challenge_id=challenge_id,
+            results_count=count,
+            values_sum=values_sum,
+            values_min=values_min,
+            values_max=values_max,
+        )
+        for (member_id, bucket, bucket_start), (
+            count, values_sum, values_min, values_max,
+        ) in by_member.items()
+    ])
+    await session.execute(_increment_on_conflict(
+        ChallengeMemberRollup,
+        stmt,
+        ["member_id", "bucket", "bucket_start"],
+    ))
+
+    stmt = insert(ChallengeRollup).values([
+        dict(
+            challenge_id=challenge_id,
+            bucket=bucket,
+            bucket_start=bucket_start,
+            results_count=count,
+            values_sum=values_sum,
+            values_min=values_min,
+            values_max=values_max,
+        )
+        for (bucket, bucket_start), (
+            count, values_sum, values_min, values_max,
+        ) in by_challenge.items()
+    ])
+    await session.execute(_increment_on_conflict(
+        ChallengeRollup,
+        stmt,
+        ["challenge_id", "bucket", "bucket_start"],
+    ))
+
+    sketch = LogSketch()
+    for _, value, _ in entries:
+        sketch.add(value)
+    stmt = insert(ChallengeValueBucket).values([
+        dict(
+            challenge_id=challenge_id,
+            sign=sign,
+            key=key,
+            results_count=count,
+        )
+        for sign, key, count in sketch.buckets()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["challenge_id", "sign", "key"],
+        set_=dict(
+            results_count=(ChallengeValueBucket.results_count
+                           + stmt.excluded.results_count),
+        ),
+    )
+    await session.execute(stmt)
+
+
+async def rebuild_rollups(
+        session: AsyncSession,
+        challenge_id: int,
+        entries: Iterable[tuple[int, float, datetime]],
+):
+    """
+    Replace rollups and the distribution sketch of the challenge with
+    ones folded from the entries, e.g. after values of already folded
+    results were changed.  Progress of buckets is kept.
+
+    :param entries: (member_id, value, created_at) of all active results
+    """
+    await session.execute(
+        delete(ChallengeMemberRollup)
+        .where(ChallengeMemberRollup.challenge_id == challenge_id)
+    )
+    await session.execute(
+        delete(ChallengeValueBucket)
+        .where(ChallengeValueBucket.challenge_id == challenge_id)
+    )
+    await session.execute(
+        update(ChallengeRollup)
+        .where(ChallengeRollup.challenge_id == challenge_id)
+        .values(results_count=0, values_sum=0,
+                values_min=None, values_max=None)
+        .execution_options(synchronize_session=False)
+    )
+    await rollup_results(session, challenge_id, entries)
+
+
+async def load_sketch(
+        session: AsyncSession,
+        challenge_id: int,
+) -> LogSketch:
+    """Distribution of active results of the challenge."""
+    rows = await session.execute(
+        select(ChallengeValueBucket.sign,
+               ChallengeValueBucket.key,
+               ChallengeValueBucket.results_count)
+        .where(ChallengeValueBucket.challenge_id == challenge_id)
+    )
+    return LogSketch.from_buckets(rows)
+
+
+async def snapshot_progress(
+        session: AsyncSession,
+        challenge_id: int,
+        progress: int,
+        moment: datetime,
+        previous_progress: int | None = None,
+):
+    """
+    Record the progress observed at the moment into its buckets.
+
+    :param previous_progress: progress observed before.  When it is
+     the same, only buckets without progress yet (i.e. started since
+     the last observation) are written, so unchanged progress costs
+     a read instead of a write every lifecycle update.
+    """
+    starts = {bucket: bucket.truncate(moment) for bucket in RollupBucketEnum}
+    if progress == previous_progress:
+        stmt = (
+            select(ChallengeRollup.bucket)
+            .where(ChallengeRollup.challenge_id == challenge_id)
+            .where(ChallengeRollup.progress.is_not(None))
+            .where(or_(*(
+                and_(ChallengeRollup.bucket == bucket,
+                     ChallengeRollup.bucket_start == bucket_start)
+                for bucket, bucket_start in starts.items()
+            )))
+        )
+        for bucket in await session.scalars(stmt):
+            del starts[bucket]
+        if not starts:
+            return
+
+    stmt = insert(ChallengeRollup).values([
+        dict(
+            challenge_id=challenge_id,
+            bucket=bucket,
+            bucket_start=bucket_start,
+            results_count=0,
+            values_sum=0,
+            progress=progress,
+        )
+        for bucket, bucket_start in starts.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["challenge_id", "bucket", "bucket_start"],
+        set_=dict(progress=stmt.excluded.progress),
+    )
+    await session.execute(stmt)
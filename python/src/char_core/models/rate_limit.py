@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from char_core.models.base import Base
+
+
+class RateLimitBucket(Base):
+    """
+    Token bucket of the rate limit shared by API processes, see
+    `char_rest_api.rate_limiting`.  Unlogged, losing buckets only
+    resets limits.
+    """
+    __tablename__ = "rate_limit_bucket"
+
+    key: Mapped[str] = mapped_column(primary_key=True)
+    tokens: Mapped[float]
+    updated_at: Mapped[datetime]
+
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
@@ -17,7 +17,10 @@ class SpaceMember(Base):
 
     id: Mapped[IntegerPk]
     is_administrator: Mapped[bool] = mapped_column(default=False)
-    space_id: Mapped[int] = mapped_column(ForeignKey("space.id"))
+    space_id: Mapped[int] = mapped_column(
+        ForeignKey("space.id"),
+        index=True,
+    )
     user_id: Mapped[int] = mapped_column(ForeignKey("user.id"))
     created_at: Mapped[CreatedAt]
 
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import text, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from char_core.locks import STATISTICS_LOCK_NAMESPACE
+from char_core.models.base import Base
+
+
+class UserStatistics(Base):
+    """
+    Read model of cross-space statistics of the user.
+
+    Materialized view, defined by migrations only (excluded from
+    autogenerate) and refreshed by the daemon, see
+    `refresh_user_statistics`.  Users registered after the last refresh
+    have no row yet.
+    """
+    __tablename__ = "user_statistics"
+    __table_args__ = {"info": {"is_view": True}}
+
+    user_id: Mapped[int] = mapped_column(primary_key=True)
+    challenges_count: Mapped[int]
+    wins_count: Mapped[int]
+    achievements_count: Mapped[int]
+    spaces_count: Mapped[int]
+    # best place among participants of finalized challenges
+    best_place: Mapped[int | None]
+    refreshed_at: Mapped[datetime]
+
+
+async def refresh_user_statistics(session: AsyncSession) -> bool:
+    """
+    Refresh without blocking readers of the view.
+    :return: False if the view is being refreshed by another process
+    """
+    is_locked = await session.scalar(select(
+        func.pg_try_advisory_xact_lock(STATISTICS_LOCK_NAMESPACE, 0),
+    ))
+    if not is_locked:
+        return False
+    await session.execute(text(
+        "refresh materialized view concurrently user_statistics"
+    ))
+    return True
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import BigInteger
+from sqlalchemy import BigInteger, ForeignKey, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import (
     Mapped,
     mapped_column,
@@ -25,11 +27,47 @@ class User(Base):
     full_name: Mapped[str]
     description: Mapped[str | None]
     created_at: Mapped[CreatedAt]
+    # bumped to revoke all access tokens issued to the user
+    token_version: Mapped[int] = mapped_column(default=0)
     achievements_assignations: Mapped[list[AchievementAssignation]] = relationship(
         primaryjoin="AchievementAssignation.user_id == User.id",
         lazy="selectin",
         viewonly=True,
     )
 
+    @classmethod
+    async def revoke_access_tokens(cls, session: AsyncSession, user_id: int):
+        """
+        Bump `token_version`, e.g. when roles embedded into the access
+        tokens of the user are revoked.  The user keeps refresh tokens,
+        refreshed access tokens carry current roles.
+        """
+        await session.execute(
+            update(cls)
+            .where(cls.id == user_id)
+            .values(token_version=cls.token_version + 1)
+        )
+
     def __str__(self):
         return f"{self.full_name} <{self.email}>"
+
+
+class RefreshToken(Base):
+    """
+    Issued refresh token, identified by the `jti` claim.
+    Tokens are never deleted before expiration, only revoked.
+    """
+    __tablename__ = "refresh_token"
+
+    jti: Mapped[str] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("user.id"),
+        index=True,
+    )
+    created_at: Mapped[CreatedAt]
+    expires_at: Mapped[datetime]
+    revoked_at: Mapped[datetime | None]
+
+    @property
+    def is_active(self) -> bool:
+        return self.revoked_at is None and self.expires_at > datetime.now()
@@ -0,0 +1,75 @@
+"""
+Postgres LISTEN/NOTIFY between the API and the daemon.
+
+Notifications are transactional: they are delivered to listeners only
+when the transaction sending them commits.
+"""
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Iterable
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+
+# payload is the id of created or edited challenge
+CHALLENGE_CHANGED_CHANNEL = "char_challenge_changed"
+# payload is the id of challenge with joined members, newly active
+# results or finalized, none of which changes deadlines
+CHALLENGE_UPDATED_CHANNEL = "char_challenge_updated"
+
+
+async def notify_challenge_changed(session: AsyncSession, challenge_id: int):
+    await session.execute(select(func.pg_notify(
+        CHALLENGE_CHANGED_CHANNEL,
+        str(challenge_id),
+    )))
+
+
+async def notify_challenge_updated(session: AsyncSession, challenge_id: int):
+    await session.execute(select(func.pg_notify(
+        CHALLENGE_UPDATED_CHANNEL,
+        str(challenge_id),
+    )))
+
+
+@asynccontextmanager
+async def listen(
+        engine: AsyncEngine,
+        channels: Iterable[str],
+        callback: Callable[[str], None],
+        on_disconnect: Callable[[], None] | None = None,
+) -> AsyncIterator[None]:
+    """
+    Call `callback` with the payload of every notification sent to
+    any of the channels while inside the context.
+
+    Holds a dedicated connection.  Notifications sent while
+    the connection is down are lost, so listeners should resync their
+    state after `on_disconnect` is called and the context is reentered.
+    """
+    async with engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        # asyncpg connection, the only driver of async engines here
+        driver_connection = raw_connection.driver_connection
+
+        def listener(_connection, _pid, _channel, payload):
+            callback(payload)
+
+        def termination_listener(_connection):
+            if on_disconnect is not None:
+                on_disconnect()
+
+        channels = list(channels)
+        for channel in channels:
+            await driver_connection.add_listener(channel, listener)
+        driver_connection.add_termination_listener(termination_listener)
+        try:
+            yield
+        finally:
+            if not driver_connection.is_closed():
+                for channel in channels:
+                    await driver_connection.remove_listener(channel, listener)
+            driver_connection.remove_termination_listener(
+                termination_listener,
+            )
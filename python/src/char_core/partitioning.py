@@ -0,0 +1,173 @@
+"""
+Management of `challenge_result` partitions.
+
+Results are partitioned by range of `challenge_id`.  Challenge ids grow
+over time, so all partitions except the last few contain only results
+of finished challenges, and may be detached to the archive storage.
+
+Partitions are created ahead of the latest challenge by every sweep of
+the daemon (or by `char-partitions ensure`), never while handling
+requests, as DDL takes locks on the whole `challenge_result`.  Results
+of challenges created past them (e.g. while the daemon is down) are
+stored in the default partition, and moved into their partition when
+it is created.
+"""
+from __future__ import annotations
+
+from sqlalchemy import text, select, func
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+
+from char_core.locks import lock_partitions
+from char_core.models.challenge import Challenge
+
+# note: changing the size breaks the layout of already created partitions
+CHALLENGE_RESULT_PARTITION_SIZE = 1000
+# partitions created ahead of the latest challenge, so challenges
+# created between sweeps of the daemon already have their partitions
+CHALLENGE_RESULT_PARTITIONS_AHEAD = 2
+CHALLENGE_RESULT_DEFAULT_PARTITION = "challenge_result_default"
+
+
+def get_result_partition_index(challenge_id: int) -> int:
+    return challenge_id // CHALLENGE_RESULT_PARTITION_SIZE
+
+
+def get_result_partition_name(index: int) -> str:
+    return f"challenge_result_p{index}"
+
+
+def get_result_partition_bounds(index: int) -> tuple[int, int]:
+    lower = index * CHALLENGE_RESULT_PARTITION_SIZE
+    return lower, lower + CHALLENGE_RESULT_PARTITION_SIZE
+
+
+async def get_result_partitions(session: AsyncSession) -> list[str]:
+    stmt = text(
+        "select child.relname from pg_inherits "
+        "join pg_class parent on parent.oid = pg_inherits.inhparent "
+        "join pg_class child on child.oid = pg_inherits.inhrelid "
+        "where parent.relname = 'challenge_result' "
+        "order by child.relname"
+    )
+    return list(await session.scalars(stmt))
+
+
+async def ensure_result_partitions(
+        session: AsyncSession,
+        challenge_id: int | None = None,
+        ahead: int = CHALLENGE_RESULT_PARTITIONS_AHEAD,
+) -> list[str]:
+    """
+    Make sure partitions for results of the challenge (or of the latest
+    challenge if not specified) and `ahead` following ones exist.
+
+    Only checks the catalog when nothing is missing, so may be called
+    often.  Partitions before the current one are never recreated,
+    as they may be intentionally detached.
+    :return: names of created partitions
+    """
+    if challenge_id is None:
+        challenge_id = await session.scalar(
+            select(func.coalesce(func.max(Challenge.id), 0))
+        )
+
+    current = get_result_partition_index(challenge_id)
+    required = {
+        get_result_partition_name(index): index
+        for index in range(current, current + ahead + 1)
+    }
+    existing = set(await get_result_partitions(session))
+    if existing.issuperset(required):
+        return []
+
+    # concurrent creation of the same partition fails even with
+    # `if not exists`, recheck under the lock
+    await lock_partitions(session)
+    existing = set(await get_result_partitions(session))
+
+    created = []
+    for name, index in required.items():
+        if name in existing:
+            continue
+        if not created:
+            await session.execute(text(
+                "create temporary table challenge_result_moved "
+                "(like challenge_result) on commit drop"
+            ))
+        await _create_result_partition(session, name, index)
+        created.append(name)
+
+    return created
+
+
+async def _create_result_partition(
+        session: AsyncSession,
+        name: str,
+        index: int,
+):
+    """
+    Create the partition, moving results of its range out of the
+    default partition, as postgres refuses to create a partition
+    overlapping rows of the default one.  Deleted rows are invisible
+    to the check within the transaction.
+    """
+    lower, upper = get_result_partition_bounds(index)
+    bounds = dict(lower=lower, upper=upper)
+    await session.execute(text(
+        f"with moved as ("
+        f"delete from {CHALLENGE_RESULT_DEFAULT_PARTITION} "
+        f"where challenge_id >= :lower and challenge_id < :upper "
+        f"returning *) "
+        f"insert into challenge_result_moved select * from moved"
+    ), bounds)
+    await session.execute(text(
+        f"create table if not exists {name} "
+        f"partition of challenge_result "
+        f"for values from ({lower}) to ({upper})"
+    ))
+    await session.execute(text(
+        "insert into challenge_result select * from challenge_result_moved"
+    ))
+    await session.execute(text("delete from challenge_result_moved"))
+
+
+async def detach_result_partition(
+        engine: AsyncEngine,
+        index: int,
+        tablespace: str | None = None,
+):
+    """
+    Detach the partition without blocking writes into the rest of
+    `challenge_result` and optionally move it to the archive tablespace.
+
+    Refuses to detach partitions having not finalized challenges.
+    """
+    name = get_result_partition_name(index)
+    lower, upper = get_result_partition_bounds(index)
+
+    async with engine.connect() as connection:
+        stmt = (
+            select(func.count())
+            .select_from(Challenge)
+            .where(Challenge.id >= lower)
+            .where(Challenge.id < upper)
+            .where(Challenge.finalized_at.is_(None))
+        )
+        if await connection.scalar(stmt):
+            raise RuntimeError(
+                f"Partition {name} has not finalized challenges.",
+            )
+        await connection.rollback()
+
+        # concurrent detach can't be executed inside transaction block
+        connection = await connection.execution_options(
+            isolation_level="AUTOCOMMIT",
+        )
+        await connection.execute(text(
+            f"alter table challenge_result "
+            f"detach partition {name} concurrently"
+        ))
+        if tablespace is not None:
+            await connection.execute(text(
+                f'alter table {name} set tablespace "{tablespace}"'
+            ))
@@ -0,0 +1,113 @@
+"""
+In-memory schedule of lifecycle deadlines of challenges, so the daemon
+transitions challenges exactly at `starts_at` and `ends_at_const`
+instead of at its next sweep.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+from datetime import datetime
+from typing import AsyncIterator, Iterable
+
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from char_core.metrics import REGISTRY
+from char_core.models.challenge import Challenge
+
+SCHEDULED_DEADLINES = REGISTRY.gauge(
+    "char_daemon_scheduled_deadlines",
+    "Deadlines of challenges waiting in the schedule.",
+)
+
+
+class DeadlineScheduler:
+    """
+    Binary heap of (deadline, challenge_id).  Rescheduled deadlines are
+    not removed from the heap, but skipped when popped, as they are no
+    longer in `_deadlines`.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, int]] = []
+        self._deadlines: dict[int, set[datetime]] = {}
+        self._wakeup = asyncio.Event()
+
+    def schedule(
+            self,
+            challenge_id: int,
+            deadlines: Iterable[datetime | None],
+    ):
+        """Replace deadlines of the challenge, past ones are ignored."""
+        now = datetime.now()
+        deadlines = {i for i in deadlines if i is not None and i > now}
+        if deadlines:
+            self._deadlines[challenge_id] = deadlines
+        else:
+            self._deadlines.pop(challenge_id, None)
+        for deadline in deadlines:
+            heapq.heappush(self._heap, (deadline, challenge_id))
+        self._update_gauge()
+        self._wakeup.set()
+
+    def _update_gauge(self):
+        SCHEDULED_DEADLINES.set(sum(map(len, self._deadlines.values())))
+
+    def _pop_due(self, now: datetime) -> list[tuple[int, datetime]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, challenge_id = heapq.heappop(self._heap)
+            deadlines = self._deadlines.get(challenge_id)
+            if deadlines is None or deadline not in deadlines:
+                continue  # rescheduled
+            deadlines.discard(deadline)
+            if not deadlines:
+                del self._deadlines[challenge_id]
+            due.append((challenge_id, deadline))
+        self._update_gauge()
+        return due
+
+    async def due(self) -> AsyncIterator[tuple[int, datetime]]:
+        """Yield (challenge_id, deadline) as deadlines pass."""
+        while True:
+            self._wakeup.clear()
+            now = datetime.now()
+            for item in self._pop_due(now):
+                yield item
+
+            timeout = None
+            if self._heap:
+                timeout = (self._heap[0][0] - datetime.now()).total_seconds()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(),
+                    max(timeout, 0) if timeout is not None else None,
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def load(
+            self,
+            session: AsyncSession,
+            challenge_id: int | None = None,
+    ):
+        """
+        Schedule upcoming deadlines of the challenge, or of all not
+        finalized challenges if not specified.
+        """
+        now = datetime.now()
+        stmt = (
+            select(Challenge.id, Challenge.starts_at, Challenge.ends_at_const)
+            .where(Challenge.finalized_at.is_(None))
+        )
+        if challenge_id is None:
+            stmt = stmt.where(or_(Challenge.starts_at > now,
+                                  Challenge.ends_at_const > now))
+        else:
+            stmt = stmt.where(Challenge.id == challenge_id)
+            # deleted or finalized challenge
+            self.schedule(challenge_id, ())
+
+        for row in await session.execute(stmt):
+            self.schedule(row.id, (row.starts_at, row.ends_at_const))
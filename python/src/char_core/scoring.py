@@ -0,0 +1,47 @@
+"""
+Selections over arrays of aggregated results, for challenges with too
+many members for per member Python loops.  Aggregation itself is
+incremental, see `Challenge._get_aggregated_results`.
+
+Results are equal to those of `SelectionFnEnum.evaluate`, see tests of
+the module.  Imports NumPy, so models import the module only when
+selecting.
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+from char_core.strategies import SelectionFnEnum
+
+
+def select(
+        fn: SelectionFnEnum,
+        values: Sequence[float] | np.ndarray,
+        argument: float,
+) -> np.ndarray:
+    """
+    Ascending indices of the selected values.  HEAD and TAIL select
+    the `argument` lowest and highest values in O(n), values equal to
+    the last selected one are taken in order of indices.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if fn is SelectionFnEnum.HIGHER_THAN:
+        return np.flatnonzero(values > argument)
+    elif fn is SelectionFnEnum.LESS_THAN:
+        return np.flatnonzero(values < argument)
+    elif fn in (SelectionFnEnum.HEAD, SelectionFnEnum.TAIL):
+        count = int(argument)
+        if count <= 0:
+            return np.empty(0, dtype=np.intp)
+        if count >= len(values):
+            return np.arange(len(values))
+
+        keys = values if fn is SelectionFnEnum.HEAD else -values
+        threshold = keys[np.argpartition(keys, count - 1)[count - 1]]
+        better = np.flatnonzero(keys < threshold)
+        ties = np.flatnonzero(keys == threshold)[:count - len(better)]
+        return np.sort(np.concatenate((better, ties)))
+    else:
+        raise NotImplementedError(fn)
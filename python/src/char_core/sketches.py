@@ -0,0 +1,134 @@
+"""
+Mergeable sketch of a distribution of values, in the manner of
+DDSketch: values are counted in logarithmic buckets, so any quantile is
+estimated with bounded relative error, and sketches are merged by
+summing counts of the same buckets.
+
+The bucket of a value depends on `relative_accuracy` only, so counts
+may be stored as rows and incremented by the database, see
+`char_core.models.history.ChallengeValueBucket`.
+"""
+from __future__ import annotations
+
+import math
+from typing import Iterable
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+# values closer to zero are counted as zeros, bounds the number of
+# buckets to about 2 * log(1 / MIN_VALUE) / relative_accuracy
+MIN_VALUE = 1e-9
+
+
+class LogSketch:
+    """
+    Buckets are identified by (sign, key).  Bucket with key `k` holds
+    absolute values in (gamma ** (k - 1), gamma ** k], zeros are counted
+    in the bucket (0, 0).
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("Relative accuracy must be in (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: dict[int, int] = {}
+        self.negative: dict[int, int] = {}
+        self.zero_count = 0
+
+    @classmethod
+    def from_buckets(
+            cls,
+            buckets: Iterable[tuple[int, int, int]],
+            relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+    ) -> LogSketch:
+        sketch = cls(relative_accuracy)
+        for sign, key, count in buckets:
+            sketch._add_to_bucket(sign, key, count)
+        return sketch
+
+    def bucket_of(self, value: float) -> tuple[int, int]:
+        magnitude = abs(value)
+        if magnitude < MIN_VALUE:
+            return 0, 0
+        key = math.ceil(math.log(magnitude) / self._log_gamma)
+        return (1 if value > 0 else -1), key
+
+    def bucket_value(self, sign: int, key: int) -> float:
+        """Value with the lowest relative error for the whole bucket."""
+        return sign * 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        self._add_to_bucket(*self.bucket_of(value), count)
+
+    def _add_to_bucket(self, sign: int, key: int, count: int):
+        if sign == 0:
+            self.zero_count += count
+            return
+        store = self.positive if sign > 0 else self.negative
+        store[key] = store.get(key, 0) + count
+
+    def merge(self, other: LogSketch):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Sketches of different accuracy can't be merged")
+        for sign, key, count in other.buckets():
+            self._add_to_bucket(sign, key, count)
+
+    @property
+    def count(self) -> int:
+        return (
+            sum(self.positive.values())
+            + sum(self.negative.values())
+            + self.zero_count
+        )
+
+    def buckets(self) -> Iterable[tuple[int, int, int]]:
+        """(sign, key, count) of non empty buckets, in ascending order."""
+        for key in sorted(self.negative, reverse=True):
+            yield -1, key, self.negative[key]
+        if self.zero_count:
+            yield 0, 0, self.zero_count
+        for key in sorted(self.positive):
+            yield 1, key, self.positive[key]
+
+    def quantile(self, q: float) -> float | None:
+        """:return: None if the sketch is empty"""
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be in [0, 1]")
+        count = self.count
+        if not count:
+            return None
+
+        rank = q * (count - 1)
+        seen = 0
+        for sign, key, bucket_count in self.buckets():
+            seen += bucket_count
+            if seen > rank:
+                return self.bucket_value(sign, key)
+        raise AssertionError("unreachable")
+
+    def histogram(
+            self,
+            bins: int,
+            lower: float,
+            upper: float,
+    ) -> list[tuple[float, float, int]]:
+        """
+        (lower, upper, count) of `bins` equal width bins between the
+        bounds.  Counts of buckets are attributed to their values.
+        """
+        if bins < 1:
+            raise ValueError("At least one bin is required")
+        width = (upper - lower) / bins
+        counts = [0] * bins
+        for sign, key, count in self.buckets():
+            value = self.bucket_value(sign, key)
+            if width > 0:
+                index = int((value - lower) / width)
+            else:
+                index = 0
+            counts[min(max(index, 0), bins - 1)] += count
+        return [
+            (lower + width * i, lower + width * (i + 1), counts[i])
+            for i in range(bins)
+        ]
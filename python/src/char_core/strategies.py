@@ -0,0 +1,120 @@
+"""
+Strategies of challenges: aggregation of results of members and
+selection of members by aggregated results.  Kept apart from models,
+so `char_core.scoring` uses them without importing models.
+"""
+from __future__ import annotations
+
+from enum import Enum
+from typing import Iterable, TypeVar
+
+from char_core.aggregation import (
+    Aggregator,
+    SumAggregator,
+    AvgAggregator,
+    CountAggregator,
+    ExtremumAggregator,
+    LastAggregator,
+    PercentileAggregator,
+)
+from char_core.exceptions import InvalidArgument
+
+_T = TypeVar("_T")
+
+
+class AggregationStrategy(Enum):
+    SUM = "SUM"
+    AVG = "AVG"
+    MAX = "MAX"
+    MIN = "MIN"
+    MEDIAN = "MEDIAN"
+    COUNT = "COUNT"
+    LAST = "LAST"
+    PERCENTILE = "PERCENTILE"  # argument is the percentile, 0..100
+
+    def aggregator(self, argument: float | None = None) -> Aggregator:
+        if self is AggregationStrategy.SUM:
+            return SumAggregator()
+        elif self is AggregationStrategy.AVG:
+            return AvgAggregator()
+        elif self is AggregationStrategy.MAX:
+            return ExtremumAggregator(max)
+        elif self is AggregationStrategy.MIN:
+            return ExtremumAggregator(min)
+        elif self is AggregationStrategy.MEDIAN:
+            return PercentileAggregator(50)
+        elif self is AggregationStrategy.COUNT:
+            return CountAggregator()
+        elif self is AggregationStrategy.LAST:
+            return LastAggregator()
+        elif self is AggregationStrategy.PERCENTILE:
+            if argument is None or not 0 <= argument <= 100:
+                raise InvalidArgument(
+                    "Percentile aggregation requires an argument "
+                    "in [0, 100]",
+                )
+            return PercentileAggregator(argument)
+        else:
+            raise NotImplementedError(self)
+
+    def evaluate(
+            self,
+            values: list[float],
+            argument: float | None = None,
+    ) -> float:
+        aggregator = self.aggregator(argument)
+        state = aggregator.init()
+        for value in values:
+            state = aggregator.update(state, value)
+        return aggregator.finalize(state)
+
+
+class SelectionFnEnum(Enum):
+    HIGHER_THAN = "HIGHER_THAN"
+    LESS_THAN = "LESS_THAN"
+    HEAD = "HEAD"
+    TAIL = "TAIL"
+
+    @property
+    def is_ascending(self) -> bool:
+        """
+        Whether lower aggregated results are the better ones.
+        """
+        return self in (SelectionFnEnum.LESS_THAN, SelectionFnEnum.HEAD)
+
+    def evaluate(
+            self,
+            values: dict[_T, float],
+            argument: float,
+    ) -> Iterable[_T]:
+        # todo: write tests for this stuff
+        if self is SelectionFnEnum.HIGHER_THAN:
+            return {k: v for k, v in values.items() if v > argument}
+        elif self is SelectionFnEnum.LESS_THAN:
+            return {k: v for k, v in values.items() if v < argument}
+        elif self in (SelectionFnEnum.HEAD, SelectionFnEnum.TAIL):
+            # sort is stable, so equal values are taken in order
+            orderred = sorted(
+                values.items(),
+                key=lambda x: x[1],
+                reverse=self is SelectionFnEnum.TAIL,
+            )
+            return dict(orderred[:int(argument)])
+        else:
+            raise NotImplementedError(self)
+
+    def evaluate_progress(
+            self,
+            values: list[float],
+            argument: float,
+    ):
+        if self is SelectionFnEnum.HIGHER_THAN:
+            # assumption: start value is 0
+            # todo: cover all such progress logic
+            numerator = AggregationStrategy.AVG.evaluate(values)
+            denominator = argument
+            if denominator == 0:
+                return 34  # todo: remember and pray :)
+            return numerator / denominator * 100
+        else:
+            raise NotImplementedError(self)
@@ -0,0 +1,56 @@
+"""
+Selection of winners of a large challenge, dict based vs
+`char_core.scoring`.
+
+    python -m char_core.tests.benchmark_scoring [members] [results]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from char_core import scoring
+from char_core.strategies import AggregationStrategy, SelectionFnEnum
+
+
+def _measure(name: str, fn, repeat: int = 3):
+    best = min(_elapsed(fn) for _ in range(repeat))
+    print(f"{name:<40} {best * 1000:10.1f} ms")
+
+
+def _elapsed(fn) -> float:
+    started_at = time.perf_counter()
+    fn()
+    return time.perf_counter() - started_at
+
+
+def _aggregate_dicts(strategy, member_ids, values):
+    grouped = dict()
+    for member_id, value in zip(member_ids, values):
+        grouped.setdefault(member_id, []).append(value)
+    return {k: strategy.evaluate(v) for k, v in grouped.items()}
+
+
+def main(members: int = 100_000, results: int = 1_000_000):
+    generator = random.Random(0)
+    member_ids = [generator.randrange(members) for _ in range(results)]
+    values = [generator.uniform(0, 1000) for _ in range(results)]
+    print(f"{members} members, {results} results")
+
+    aggregated = _aggregate_dicts(
+        AggregationStrategy.MAX, member_ids, values)
+    aggregated_array = np.fromiter(aggregated.values(), dtype=np.float64)
+    for fn in (SelectionFnEnum.HEAD, SelectionFnEnum.HIGHER_THAN):
+        _measure(
+            f"select {fn.value}, dicts",
+            lambda: fn.evaluate(aggregated, 10),
+        )
+        _measure(
+            f"select {fn.value}, numpy",
+            lambda: scoring.select(fn, aggregated_array, 10),
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from dishka import make_async_container
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from char_core.models import (
+    AggregationStrategy,
+    Challenge,
+    ChallengeMember,
+    SelectionFnEnum,
+    Space,
+    User,
+)
+from char_rest_api.admin.views import ChallengeMemberAdmin
+from char_rest_api.infrastructure import InfrastructureProvider
+
+
+@pytest_asyncio.fixture
+async def engine():
+    async_container = make_async_container(InfrastructureProvider())
+    yield await async_container.get(AsyncEngine)
+    await async_container.close()
+
+
+@pytest_asyncio.fixture
+async def challenge(engine: AsyncEngine):
+    # committed, as views of the admin use sessions of their own
+    suffix = uuid4().hex
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        space = Space(name="Admin", description="d")
+        challenge = Challenge(
+            space=space,
+            name="Admin ch",
+            description="d",
+            is_verification_required=False,
+            is_estimation_required=False,
+            results_aggregation_strategy=AggregationStrategy.MAX,
+            starts_at=datetime.now() + timedelta(hours=1),
+            ends_at_const=datetime.now() + timedelta(hours=2),
+            prize_determination_fn=SelectionFnEnum.HEAD,
+            prize_determination_argument=1,
+            participants_count=2,
+        )
+        users = [
+            User(
+                email=f"admin-{index}-{suffix}@example.com",
+                phone_number=88888888888,
+                password_hash="123",
+                full_name=f"Participant {index}",
+                description="d",
+            )
+            for index in range(2)
+        ]
+        session.add_all([
+            space,
+            challenge,
+            *users,
+            *(
+                ChallengeMember(
+                    challenge=challenge,
+                    user=user,
+                    is_referee=False,
+                    is_administrator=False,
+                    is_participant=True,
+                )
+                for user in users
+            ),
+        ])
+        await session.commit()
+
+    yield challenge
+
+    async with AsyncSession(engine) as session:
+        await session.execute(
+            delete(ChallengeMember)
+            .where(ChallengeMember.challenge_id == challenge.id)
+        )
+        await session.execute(
+            delete(Challenge).where(Challenge.id == challenge.id),
+        )
+        await session.execute(delete(Space).where(Space.id == space.id))
+        await session.execute(
+            delete(User).where(User.id.in_([i.id for i in users])),
+        )
+        await session.commit()
+
+
+def _view(engine: AsyncEngine) -> ChallengeMemberAdmin:
+    view = ChallengeMemberAdmin()
+    view.session_maker = async_sessionmaker(engine)
+    view.is_async = True
+    return view
+
+
+async def _participants_count(engine: AsyncEngine, challenge_id: int):
+    async with AsyncSession(engine) as session:
+        return await session.scalar(
+            select(Challenge.participants_count)
+            .where(Challenge.id == challenge_id)
+        )
+
+
+@pytest.mark.asyncio
+async def test_member_edits_recount_participants(
+        engine: AsyncEngine,
+        challenge: Challenge,
+):
+    view = _view(engine)
+    async with AsyncSession(engine) as session:
+        member = await session.scalar(
+            select(ChallengeMember)
+            .where(ChallengeMember.challenge_id == challenge.id)
+            .limit(1)
+        )
+        member.is_participant = False
+        await session.commit()
+
+    await view.after_model_change({}, member, False, None)
+    assert await _participants_count(engine, challenge.id) == 1
+
+
+@pytest.mark.asyncio
+async def test_member_removal_recounts_participants(
+        engine: AsyncEngine,
+        challenge: Challenge,
+):
+    view = _view(engine)
+    async with AsyncSession(engine) as session:
+        member = await session.scalar(
+            select(ChallengeMember)
+            .where(ChallengeMember.challenge_id == challenge.id)
+            .limit(1)
+        )
+        await session.delete(member)
+        await session.commit()
+
+    await view.after_model_delete(member, None)
+    assert await _participants_count(engine, challenge.id) == 1
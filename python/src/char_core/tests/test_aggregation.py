@@ -0,0 +1,83 @@
+import json
+import random
+
+import pytest
+
+from char_core.exceptions import InvalidArgument
+from char_core.strategies import AggregationStrategy
+
+
+def _aggregate_in_parts(strategy: AggregationStrategy, values, argument=None):
+    # folded in chunks and merged, as partial aggregations would be
+    aggregator = strategy.aggregator(argument)
+    state = aggregator.init()
+    for start in range(0, len(values), 7):
+        part = aggregator.init()
+        for index, value in enumerate(values[start:start + 7], start):
+            part = aggregator.update(part, value, order=index)
+        state = aggregator.merge(state, part)
+    return aggregator.finalize(state)
+
+
+@pytest.mark.parametrize("strategy, expected", [
+    (AggregationStrategy.SUM, lambda values: sum(values)),
+    (AggregationStrategy.AVG, lambda values: sum(values) / len(values)),
+    (AggregationStrategy.MAX, max),
+    (AggregationStrategy.MIN, min),
+    (AggregationStrategy.COUNT, len),
+    (AggregationStrategy.LAST, lambda values: values[-1]),
+])
+def test_exact_strategies(strategy, expected):
+    generator = random.Random(1)
+    # integral values, so the naive sum is exact too
+    values = [float(generator.randint(-1000, 1000)) for _ in range(100)]
+    assert strategy.evaluate(values) == expected(values)
+    assert _aggregate_in_parts(strategy, values) == expected(values)
+
+
+def test_sum_is_exact():
+    values = [1e16, 1., -1e16] * 10
+    assert AggregationStrategy.SUM.evaluate(values) == 10
+    assert AggregationStrategy.AVG.evaluate(values) == pytest.approx(1 / 3)
+
+
+def test_percentiles():
+    values = [float(i) for i in range(1, 1002)]
+    random.Random(2).shuffle(values)
+    assert AggregationStrategy.MEDIAN.evaluate(values) == pytest.approx(
+        501, rel=0.01)
+    assert _aggregate_in_parts(
+        AggregationStrategy.PERCENTILE, values, argument=90,
+    ) == pytest.approx(901, rel=0.01)
+
+    with pytest.raises(InvalidArgument):
+        AggregationStrategy.PERCENTILE.aggregator()
+    with pytest.raises(InvalidArgument):
+        AggregationStrategy.PERCENTILE.aggregator(101)
+
+
+@pytest.mark.parametrize("strategy", list(AggregationStrategy))
+def test_no_values(strategy):
+    assert strategy.evaluate([], argument=50) == 0
+
+
+@pytest.mark.parametrize("strategy, argument", [
+    (AggregationStrategy.SUM, None),
+    (AggregationStrategy.AVG, None),
+    (AggregationStrategy.MAX, None),
+    (AggregationStrategy.COUNT, None),
+    (AggregationStrategy.LAST, None),
+    (AggregationStrategy.PERCENTILE, 90),
+])
+def test_states_survive_json(strategy, argument):
+    # states are stored between lifecycle updates as json
+    generator = random.Random(3)
+    values = [generator.uniform(-100, 100) for _ in range(500)]
+    aggregator = strategy.aggregator(argument)
+    state = aggregator.init()
+    for index, value in enumerate(values):
+        data = json.loads(json.dumps(aggregator.dump(state)))
+        order = (f"2026-10-20T10:00:{index // 100:02}.{index:06}", index)
+        state = aggregator.update(aggregator.load(data), value, order=order)
+
+    assert aggregator.finalize(state) == strategy.evaluate(values, argument)
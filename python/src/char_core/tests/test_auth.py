@@ -0,0 +1,105 @@
+import json
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from authx import AuthX
+from dishka import make_async_container
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from char_core.models import User
+from char_rest_api.infrastructure import InfrastructureProvider, RestAPIConfig
+from char_rest_api.main.rest_api import _create_app
+from char_rest_api.routers.auth import create_access_token
+
+
+@pytest_asyncio.fixture
+async def container():
+    async_container = make_async_container(InfrastructureProvider())
+    yield async_container
+    await async_container.close()
+
+
+@pytest_asyncio.fixture
+async def engine(container):
+    return await container.get(AsyncEngine)
+
+
+async def _call(app, method: str, path: str, token: str, body=None) -> int:
+    """Status of the response of the app, without a server."""
+    messages = [{
+        "type": "http.request",
+        "body": b"" if body is None else json.dumps(body).encode(),
+        "more_body": False,
+    }]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {"type": "http.disconnect"}
+
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    await app({
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"authorization", f"Bearer {token}".encode()),
+            (b"content-type", b"application/json"),
+        ],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }, receive, send)
+    return statuses[0]
+
+
+@pytest.mark.asyncio
+async def test_revoked_access_token_is_rejected(
+        container,
+        engine: AsyncEngine,
+):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user = User(
+            email=f"revoked-{uuid4().hex}@example.com",
+            phone_number=88888888888,
+            password_hash="123",
+            full_name="Revoked",
+            description="d",
+        )
+        session.add(user)
+        await session.commit()
+        token = await create_access_token(
+            session=session,
+            security=await container.get(AuthX),
+            rest_api_config=await container.get(RestAPIConfig),
+            user_id=user.id,
+        )
+
+    app = _create_app(container, lifespan=None)
+    try:
+        assert await _call(app, "GET", "/me", token) == 200
+
+        async with AsyncSession(engine) as session:
+            await User.revoke_access_tokens(session, user.id)
+            await session.commit()
+
+        assert await _call(app, "GET", "/me", token) == 401
+        # a write route depending on the `User`
+        assert await _call(
+            app, "POST", "/spaces", token, {"name": "Revoked"},
+        ) == 401
+    finally:
+        async with AsyncSession(engine) as session:
+            await session.execute(delete(User).where(User.id == user.id))
+            await session.commit()
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+from char_rest_api.caching import ChallengeCache
+
+
+def _cache(max_entries=10, max_bytes=1000, ttl=60) -> ChallengeCache:
+    cache = ChallengeCache(max_entries, max_bytes, ttl)
+    cache.is_listening = True
+    return cache
+
+
+def test_put_and_get():
+    cache = _cache()
+    cache.put(1, cache.generation(1), b"first")
+    assert cache.get(1) == b"first"
+    assert cache.get(2) is None
+
+
+def test_nothing_is_cached_while_not_listening():
+    cache = _cache()
+    cache.is_listening = False
+    cache.put(1, cache.generation(1), b"first")
+    assert cache.get(1) is None
+
+
+def test_invalidation_increments_generation():
+    cache = _cache()
+    cache.put(1, cache.generation(1), b"first")
+    cache.put(2, cache.generation(2), b"second")
+
+    cache.invalidate(1)
+    assert cache.get(1) is None
+    # others are intact
+    assert cache.get(2) == b"second"
+
+
+def test_content_loaded_concurrently_with_change_is_not_cached():
+    cache = _cache()
+    generation = cache.generation(1)  # read before loading
+    cache.invalidate(1)  # notified while loading
+    cache.put(1, generation, b"stale")
+    assert cache.get(1) is None
+
+    cache.put(1, cache.generation(1), b"fresh")
+    assert cache.get(1) == b"fresh"
+
+
+def test_clear_invalidates_generations_of_all_challenges():
+    cache = _cache()
+    generation = cache.generation(1)
+    cache.clear()  # e.g. reconnect of the listener
+    cache.put(1, generation, b"stale")
+    assert cache.get(1) is None
+
+
+def test_entries_expire():
+    cache = _cache(ttl=60)
+    cache.put(1, cache.generation(1), b"first")
+    cache.put(
+        2, cache.generation(2), b"second",
+        expires_at=datetime.now() - timedelta(seconds=1),
+    )
+    assert cache.get(1) == b"first"
+    assert cache.get(2) is None
+
+    expired = _cache(ttl=0)
+    expired.put(1, expired.generation(1), b"first")
+    assert expired.get(1) is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = _cache(max_entries=2)
+    cache.put(1, cache.generation(1), b"first")
+    cache.put(2, cache.generation(2), b"second")
+    assert cache.get(1) == b"first"  # 2 is the least recently used now
+    cache.put(3, cache.generation(3), b"third")
+
+    assert cache.get(1) == b"first"
+    assert cache.get(2) is None
+    assert cache.get(3) == b"third"
+
+
+def test_entries_are_evicted_by_size():
+    cache = _cache(max_bytes=10)
+    cache.put(1, cache.generation(1), b"12345")
+    cache.put(2, cache.generation(2), b"12345")
+    cache.put(3, cache.generation(3), b"123")
+    assert cache.get(1) is None
+    assert cache.get(2) == b"12345"
+    assert cache.get(3) == b"123"
+
+    # larger than the whole cache
+    cache.put(4, cache.generation(4), b"12345678901")
+    assert cache.get(4) is None
+    assert cache.get(2) == b"12345"
+
+    # replacing an entry accounts for its previous size
+    cache.put(2, cache.generation(2), b"1234567")
+    assert cache.get(2) == b"1234567"
+    assert cache.get(3) == b"123"
@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import pytest
+
+from char_rest_api.coalescing import SingleFlight
+from char_rest_api.deadlines import _Deadline, _deadline, remaining
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_the_load():
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        await release.wait()
+        return loads
+
+    calls = [
+        asyncio.ensure_future(single_flight.do("key", load))
+        for _ in range(5)
+    ]
+    other = asyncio.ensure_future(single_flight.do("other", load))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*calls) == [1, 1, 1, 1, 1]
+    assert await other == 2
+    assert loads == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_load():
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "loaded"
+
+    first = asyncio.ensure_future(single_flight.do("key", load))
+    second = asyncio.ensure_future(single_flight.do("key", load))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "loaded"
+    assert first.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_exceptions_propagate_to_every_caller():
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        raise ValueError("failed")
+
+    calls = [
+        asyncio.ensure_future(single_flight.do("key", load))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_key_is_forgotten_when_the_load_ends():
+    single_flight = SingleFlight()
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        if loads == 1:
+            raise ValueError("failed")
+        return loads
+
+    with pytest.raises(ValueError):
+        await single_flight.do("key", load)
+    assert await single_flight.do("key", load) == 2
+    assert await single_flight.do("key", load) == 3
+    assert not single_flight._calls
+
+
+@pytest.mark.asyncio
+async def test_load_runs_under_the_loosest_deadline_of_callers():
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return remaining()
+
+    async def call(budget: float | None):
+        at = None if budget is None else time.monotonic() + budget
+        _deadline.set(_Deadline(at))
+        return await single_flight.do("key", load)
+
+    first = asyncio.ensure_future(call(1))
+    second = asyncio.ensure_future(call(60))
+    await asyncio.sleep(0)
+    release.set()
+    seconds, _ = await asyncio.gather(first, second)
+    assert 1 < seconds <= 60
+
+    release.clear()
+    first = asyncio.ensure_future(call(1))
+    second = asyncio.ensure_future(call(None))  # e.g. not in a request
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(first, second) == [None, None]
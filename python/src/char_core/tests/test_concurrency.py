@@ -0,0 +1,173 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from dishka import make_async_container
+from sqlalchemy import delete, select, func, update
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+
+from char_core.models import (
+    Challenge,
+    Space,
+    User,
+    SelectionFnEnum, AggregationStrategy, ChallengeResult,
+    ChallengeMember, ChallengeMemberRollup, ChallengeRollup,
+    RollupBucketEnum, ChallengeValueBucket,
+)
+from char_core.partitioning import ensure_result_partitions
+from char_rest_api.infrastructure import InfrastructureProvider
+
+MEMBERS = 20
+SUBMISSIONS = 300
+# below the pool size of the engine
+CONNECTIONS = 10
+
+
+@pytest_asyncio.fixture
+async def engine():
+    async_container = make_async_container(InfrastructureProvider())
+    yield await async_container.get(AsyncEngine)
+    await async_container.close()
+
+
+async def _cleanup(engine: AsyncEngine, challenge_id, space_id, user_ids):
+    # submissions are committed by separate sessions, so the data
+    # can't be rolled back as in other tests
+    async with AsyncSession(engine) as session:
+        for model in (ChallengeMemberRollup, ChallengeRollup,
+                      ChallengeValueBucket, ChallengeResult, ChallengeMember):
+            await session.execute(
+                delete(model).where(model.challenge_id == challenge_id),
+            )
+        await session.execute(
+            delete(Challenge).where(Challenge.id == challenge_id),
+        )
+        await session.execute(delete(Space).where(Space.id == space_id))
+        await session.execute(delete(User).where(User.id.in_(user_ids)))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submissions(engine: AsyncEngine):
+    suffix = uuid4().hex
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        space = Space(name="Stress", description="d")
+        challenge = Challenge(
+            space=space,
+            name="Stress ch",
+            description="d",
+            is_verification_required=False,
+            is_estimation_required=False,
+            results_aggregation_strategy=AggregationStrategy.SUM,
+            starts_at=datetime.now() - timedelta(hours=1),
+            ends_at_determination_fn=SelectionFnEnum.HIGHER_THAN,
+            ends_at_determination_argument=1e9,
+            prize_determination_fn=SelectionFnEnum.HEAD,
+            prize_determination_argument=1,
+        )
+        members = [
+            ChallengeMember(
+                challenge=challenge,
+                user=User(
+                    email=f"stress-{i}-{suffix}@example.com",
+                    password_hash="123",
+                    full_name="123",
+                ),
+                is_participant=True,
+            )
+            for i in range(MEMBERS)
+        ]
+        session.add_all((space, challenge, *members))
+        await session.flush()
+        await ensure_result_partitions(session, challenge.id)
+        await session.commit()
+
+        challenge_id = challenge.id
+        member_ids = [i.id for i in members]
+        user_ids = [i.user_id for i in members]
+
+    expected = defaultdict(float)
+    connections = asyncio.Semaphore(CONNECTIONS)
+
+    async def submit(member_id: int, value: float):
+        async with connections:
+            async with AsyncSession(
+                    engine,
+                    expire_on_commit=False,
+            ) as submitter_session:
+                submitter_session.add(ChallengeResult(
+                    member_id=member_id,
+                    challenge_id=challenge_id,
+                    submitted_value=value,
+                ))
+                await submitter_session.commit()
+                submitted_challenge = await submitter_session.get(
+                    Challenge, challenge_id)
+                await submitted_challenge.update_lifecycle_state(
+                    session=submitter_session,
+                    wait=False,
+                )
+
+    submissions = []
+    for i in range(SUBMISSIONS):
+        member_id = member_ids[i % MEMBERS]
+        expected[member_id] += i
+        submissions.append(submit(member_id, i))
+
+    try:
+        await asyncio.gather(*submissions)
+
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            # what the daemon does after skipped recomputes
+            challenge = await session.get(Challenge, challenge_id)
+            assert await challenge.update_lifecycle_state(session)
+
+            aggregated = dict(await session.execute(
+                select(ChallengeMember.id,
+                       ChallengeMember.cached_aggregated_result)
+                .where(ChallengeMember.challenge_id == challenge_id)
+            ))
+            assert aggregated == expected
+
+            # every result is folded into rollups exactly once
+            results_count, values_sum = (await session.execute(
+                select(func.sum(ChallengeRollup.results_count),
+                       func.sum(ChallengeRollup.values_sum))
+                .where(ChallengeRollup.challenge_id == challenge_id)
+                .where(ChallengeRollup.bucket == RollupBucketEnum.HOUR)
+            )).one()
+            assert results_count == SUBMISSIONS
+            assert values_sum == sum(expected.values())
+            assert await session.scalar(
+                select(func.sum(ChallengeValueBucket.results_count))
+                .where(ChallengeValueBucket.challenge_id == challenge_id)
+            ) == SUBMISSIONS
+
+            # value of a folded result edited by the admin
+            await session.execute(
+                update(ChallengeResult)
+                .where(ChallengeResult.challenge_id == challenge_id)
+                .where(ChallengeResult.submitted_value == 0)
+                .values(submitted_value=SUBMISSIONS)
+            )
+            await session.execute(
+                update(Challenge)
+                .where(Challenge.id == challenge_id)
+                .values(is_aggregation_stale=True)
+            )
+            await session.commit()
+            assert await challenge.update_lifecycle_state(session)
+
+            results_count, values_sum = (await session.execute(
+                select(func.sum(ChallengeRollup.results_count),
+                       func.sum(ChallengeRollup.values_sum))
+                .where(ChallengeRollup.challenge_id == challenge_id)
+                .where(ChallengeRollup.bucket == RollupBucketEnum.HOUR)
+            )).one()
+            assert results_count == SUBMISSIONS
+            assert values_sum == sum(expected.values()) + SUBMISSIONS
+    finally:
+        await _cleanup(engine, challenge_id, space.id, user_ids)
@@ -0,0 +1,105 @@
+import sqlite3
+import time
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.util import greenlet_spawn
+
+from char_rest_api.deadlines import (
+    DeadlinePool,
+    LoadShedder,
+    LoadSheddingConfig,
+    _Deadline,
+    _deadline,
+)
+
+CONFIG = LoadSheddingConfig(max_waiting_reads=1, max_waiting_writes=2)
+
+
+def _pool(capacity: int) -> QueuePool:
+    return QueuePool(
+        lambda: sqlite3.connect(":memory:"),
+        pool_size=capacity,
+        max_overflow=0,
+    )
+
+
+def test_requests_are_not_shed_until_pool_is_saturated():
+    load_shedder = LoadShedder(CONFIG)
+    pool = _pool(1)
+    load_shedder.watch(pool, capacity=1)
+
+    # e.g. served from caches, without connections
+    for _ in range(5):
+        assert load_shedder.try_enter(is_read=True)
+    assert load_shedder.in_flight == 5
+
+
+def test_reads_are_shed_before_writes():
+    load_shedder = LoadShedder(CONFIG)
+    pool = _pool(1)
+    load_shedder.watch(pool, capacity=1)
+
+    assert load_shedder.try_enter(is_read=False)
+    connection = pool.connect()
+    assert load_shedder.checked_out == 1
+    assert load_shedder.is_saturated
+
+    # waiting for the connection
+    assert load_shedder.try_enter(is_read=True)
+    assert not load_shedder.try_enter(is_read=True)
+    assert load_shedder.try_enter(is_read=False)
+    assert not load_shedder.try_enter(is_read=False)
+
+    connection.close()
+    assert load_shedder.checked_out == 0
+    assert load_shedder.try_enter(is_read=True)
+
+    for _ in range(4):
+        load_shedder.leave()
+    assert load_shedder.in_flight == 0
+
+
+def test_every_watched_pool_is_counted():
+    load_shedder = LoadShedder(CONFIG)
+    primary, replica = _pool(2), _pool(1)
+    load_shedder.watch(primary, capacity=2)
+    load_shedder.watch(replica, capacity=1)
+
+    connections = [primary.connect(), replica.connect()]
+    assert load_shedder.checked_out == 2
+    # the replica is saturated
+    assert load_shedder.is_saturated
+    connections.pop().close()
+    assert not load_shedder.is_saturated
+    connections.pop().close()
+    assert load_shedder.checked_out == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_waits_at_most_until_deadline():
+    pool = DeadlinePool(
+        lambda: sqlite3.connect(":memory:"),
+        pool_size=1,
+        max_overflow=0,
+        timeout=30,
+    )
+    connection = await greenlet_spawn(pool.connect)
+
+    token = _deadline.set(_Deadline(time.monotonic() + 0.1))
+    try:
+        started_at = time.monotonic()
+        with pytest.raises(PoolTimeoutError):
+            await greenlet_spawn(pool.connect)
+        assert time.monotonic() - started_at < 5
+
+        # past the deadline, at once
+        _deadline.set(_Deadline(time.monotonic() - 1))
+        with pytest.raises(PoolTimeoutError):
+            await greenlet_spawn(pool.connect)
+    finally:
+        _deadline.reset(token)
+
+    await greenlet_spawn(connection.close)
+    await greenlet_spawn(pool.dispose)
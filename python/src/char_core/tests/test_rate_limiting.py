@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from dishka import make_async_container
+from fastapi import HTTPException
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from char_core.models.rate_limit import RateLimitBucket
+from char_rest_api import rate_limiting
+from char_rest_api.infrastructure import InfrastructureProvider
+from char_rest_api.rate_limiting import (
+    MemoryTokenBucketStore,
+    PostgresTokenBucketStore,
+    RateLimiter,
+    TokenBucketLimit,
+)
+
+LIMIT = TokenBucketLimit(capacity=3, refill_per_second=0.5)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(
+        rate_limiting, "time", SimpleNamespace(monotonic=lambda: clock.now),
+    )
+    return clock
+
+
+@pytest.mark.asyncio
+async def test_memory_store_refills_buckets(clock):
+    store = MemoryTokenBucketStore()
+    assert [await store.take("a", LIMIT) for _ in range(4)] == [
+        True, True, True, False,
+    ]
+    # buckets are separate
+    assert await store.take("b", LIMIT)
+
+    clock.now += 1.9
+    assert not await store.take("a", LIMIT)
+    clock.now += 0.1
+    assert await store.take("a", LIMIT)
+    assert not await store.take("a", LIMIT)
+
+    # never above the capacity
+    clock.now += 3600
+    assert [await store.take("a", LIMIT) for _ in range(4)] == [
+        True, True, True, False,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_memory_store_evicts_least_recently_used_buckets(clock):
+    store = MemoryTokenBucketStore(max_buckets=10)
+    for _ in range(3):
+        await store.take("active", LIMIT)
+    for index in range(10):
+        await store.take(f"other-{index}", LIMIT)
+        await store.take("active", LIMIT)  # kept as recently used
+
+    assert len(store._buckets) <= 10
+    assert "active" in store._buckets
+    assert "other-0" not in store._buckets
+    assert not await store.take("active", LIMIT)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_rejects_with_retry_after(clock):
+    limiter = RateLimiter({"write": LIMIT}, MemoryTokenBucketStore())
+    for _ in range(3):
+        await limiter.ensure_allowed("write", "user")
+    with pytest.raises(HTTPException) as info:
+        await limiter.ensure_allowed("write", "user")
+    assert info.value.status_code == 429
+    assert info.value.headers == {"Retry-After": "2"}
+
+    # limits are per user and per name
+    await limiter.ensure_allowed("write", "other")
+    # not configured
+    for _ in range(10):
+        await limiter.ensure_allowed("read", "user")
+
+
+@pytest_asyncio.fixture
+async def engine():
+    async_container = make_async_container(InfrastructureProvider())
+    yield await async_container.get(AsyncEngine)
+    await async_container.close()
+
+
+@pytest.mark.asyncio
+async def test_postgres_store(engine: AsyncEngine):
+    store = PostgresTokenBucketStore(engine)
+    key = f"test:{uuid4().hex}"
+    # refills at most a token a minute within the test
+    limit = TokenBucketLimit(capacity=2, refill_per_second=1 / 60)
+    try:
+        assert [await store.take(key, limit) for _ in range(3)] == [
+            True, True, False,
+        ]
+        assert await store.take(f"{key}:other", limit)
+    finally:
+        async with engine.begin() as connection:
+            await connection.execute(
+                delete(RateLimitBucket).where(
+                    RateLimitBucket.key.startswith(key),
+                ),
+            )
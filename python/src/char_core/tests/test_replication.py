@@ -0,0 +1,64 @@
+from starlette.requests import Request
+
+from char_rest_api.replication import (
+    REPLICA_LSN_COOKIE,
+    REPLICA_LSN_HEADER,
+    get_pinned_lsn,
+    parse_lsn,
+    require_pin,
+    requires_primary,
+)
+
+
+def _request(headers: dict[str, str]) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [
+            (name.lower().encode(), value.encode())
+            for name, value in headers.items()
+        ],
+    })
+
+
+def test_parse_lsn():
+    assert parse_lsn("0/0") == 0
+    assert parse_lsn("0/16B3748") == 0x16B3748
+    assert parse_lsn("16/B374D848") == (0x16 << 32) + 0xB374D848
+    # ordered as positions, not as text
+    assert parse_lsn("1/0") > parse_lsn("0/FFFFFFFF")
+    assert parse_lsn("garbage") is None
+    assert parse_lsn("X/1") is None
+
+
+def test_pinned_lsn_is_carried_by_header_or_cookie():
+    assert get_pinned_lsn(_request({})) is None
+    assert get_pinned_lsn(_request({
+        REPLICA_LSN_HEADER: "0/10",
+    })) == 0x10
+    assert get_pinned_lsn(_request({
+        "Cookie": f"{REPLICA_LSN_COOKIE}=0/20",
+    })) == 0x20
+    assert get_pinned_lsn(_request({
+        REPLICA_LSN_HEADER: "0/10",
+        "Cookie": f"{REPLICA_LSN_COOKIE}=0/20",
+    })) == 0x10
+    assert get_pinned_lsn(_request({REPLICA_LSN_HEADER: "bad"})) is None
+
+
+def test_reads_are_routed_to_primary_until_replica_replays_the_pin():
+    # not pinned clients always read from the replica
+    assert not requires_primary(None, "0/10")
+    assert not requires_primary(None, None)
+
+    assert requires_primary(0x20, "0/10")
+    assert not requires_primary(0x20, "0/20")
+    assert not requires_primary(0x20, "1/0")
+    # replica which is not in recovery, or reporting garbage
+    assert requires_primary(0x20, None)
+    assert requires_primary(0x20, "garbage")
+
+
+def test_pin_outside_of_requests_is_ignored():
+    require_pin()  # e.g. commits of the daemon
@@ -0,0 +1,18 @@
+import random
+
+import pytest
+
+from char_core.strategies import SelectionFnEnum
+from char_core import scoring
+
+
+@pytest.mark.parametrize("fn", list(SelectionFnEnum))
+@pytest.mark.parametrize("argument", [0, 1, 10, 100, 1000])
+def test_select_equals_evaluate(fn, argument):
+    generator = random.Random(argument)
+    # plenty of ties
+    values = [float(generator.randint(0, 30)) for _ in range(200)]
+
+    expected = fn.evaluate(dict(enumerate(values)), argument)
+    selected = scoring.select(fn, values, argument)
+    assert selected.tolist() == sorted(expected)
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from char_core.sketches import LogSketch
+
+
+def _exact_quantile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+def test_quantiles_within_relative_accuracy():
+    generator = random.Random(42)
+    values = [generator.lognormvariate(3, 2) for _ in range(10_000)]
+    values += [-i for i in values[:1000]] + [0.] * 100
+    sketch = LogSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    assert sketch.count == len(values)
+    for q in (0, 0.01, 0.25, 0.5, 0.9, 0.99, 1):
+        exact = _exact_quantile(values, q)
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.01, abs=1e-9)
+
+
+def test_merge_equals_single_sketch():
+    generator = random.Random(7)
+    values = [generator.uniform(-100, 1000) for _ in range(5000)]
+    whole = LogSketch()
+    left, right = LogSketch(), LogSketch()
+    for index, value in enumerate(values):
+        whole.add(value)
+        (left if index % 3 else right).add(value)
+
+    left.merge(right)
+    assert list(left.buckets()) == list(whole.buckets())
+    # buckets are enough to restore the sketch, as stored in the database
+    restored = LogSketch.from_buckets(whole.buckets())
+    assert restored.quantile(0.5) == whole.quantile(0.5)
+
+    with pytest.raises(ValueError):
+        left.merge(LogSketch(relative_accuracy=0.05))
+
+
+def test_empty_and_histogram():
+    sketch = LogSketch()
+    assert sketch.quantile(0.5) is None
+
+    for value in (1, 2, 3, 10, 10, 10):
+        sketch.add(value)
+    histogram = sketch.histogram(bins=3, lower=1, upper=10)
+    assert [count for _, _, count in histogram] == [3, 0, 3]
+    assert histogram[0][0] == 1 and histogram[-1][1] == 10
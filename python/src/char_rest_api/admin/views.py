@@ -1,4 +1,11 @@
+from typing import ClassVar
+
 from sqladmin import ModelView
+from sqladmin.filters import ForeignKeyFilter, BooleanFilter
+from sqlalchemy import Select, text, update
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import noload, defaultload, Mapper
+from starlette.requests import Request
 
 from char_core.models.user import (
     User,
@@ -6,9 +13,73 @@ from char_core.models.user import (
 from char_core.models.challenge import ChallengeResult, ChallengeMember, \
     Challenge, Achievement, AchievementAssignation
 from char_core.models.space import Space, SpaceMember
+from char_core.notifications import (
+    notify_challenge_changed,
+    notify_challenge_updated,
+)
+
+
+def _noload_collections(mapper: Mapper, path=None, depth: int = 2):
+    """
+    Loader options disabling all collections reachable from the model
+    through scalar relationships, as models load many of them eagerly.
+    """
+    for relation in mapper.relationships:
+        attribute = relation.class_attribute
+        if relation.uselist:
+            yield noload(attribute) if path is None \
+                else path.noload(attribute)
+        elif depth > 0:
+            subpath = defaultload(attribute) if path is None \
+                else path.defaultload(attribute)
+            yield from _noload_collections(
+                relation.mapper, subpath, depth - 1)
+
+
+# also counts partitions of partitioned tables
+_estimated_count_stmt = text(
+    "select coalesce(sum(greatest(reltuples, 0)), 0)::bigint "
+    "from pg_class "
+    "where oid = cast(:table_name as regclass) "
+    "or oid in (select inhrelid from pg_inherits "
+    "where inhparent = cast(:table_name as regclass))"
+)
 
 
-class UserAdmin(ModelView, model=User):
+class BaseModelView(ModelView):
+    """
+    Model view usable on large tables: list page never loads
+    collections and unfiltered count is estimated by the planner
+    statistics when the table is big enough.
+    """
+    estimated_count_threshold: ClassVar[int] = 10_000
+
+    def list_query(self, request: Request) -> Select:
+        return (
+            super().list_query(request)
+            .options(*_noload_collections(sa_inspect(self.model)))
+        )
+
+    def _is_filtered(self, request: Request) -> bool:
+        if request.query_params.get("search"):
+            return True
+        return any(
+            request.query_params.get(i.parameter_name)
+            for i in self.get_filters()
+        )
+
+    async def count(self, request: Request, stmt: Select | None = None) -> int:
+        if not self._is_filtered(request):
+            estimated_stmt = _estimated_count_stmt.bindparams(
+                table_name=self.model.__tablename__,
+            )
+            estimated = (await self._run_query(estimated_stmt))[0]
+            if estimated > self.estimated_count_threshold:
+                return estimated
+        return await super().count(request, stmt)
+
+
+class UserAdmin(BaseModelView, model=User):
     column_list = [
         "id",
         "email",
@@ -19,7 +90,7 @@ class UserAdmin(ModelView, model=User):
     ]
 
 
-class SpaceAdmin(ModelView, model=Space):
+class SpaceAdmin(BaseModelView, model=Space):
     column_list = [
         "id",
         "name",
@@ -33,7 +104,7 @@ class SpaceAdmin(ModelView, model=Space):
     ]
 
 
-class SpaceMemberAdmin(ModelView, model=SpaceMember):
+class SpaceMemberAdmin(BaseModelView, model=SpaceMember):
     column_list = [
         "is_administrator",
         "space",
@@ -41,8 +112,22 @@ class SpaceMemberAdmin(ModelView, model=SpaceMember):
         "created_at",
     ]
 
+    async def on_model_change(self, data, model, is_created, request):
+        # roles of the user embedded into access tokens may be revoked,
+        # see `char_rest_api.principal`.  model is not changed yet
+        if not is_created:
+            await self._revoke_access_tokens(model.user_id)
+
+    async def after_model_delete(self, model, request):
+        await self._revoke_access_tokens(model.user_id)
+
+    async def _revoke_access_tokens(self, user_id: int):
+        async with self.session_maker() as session:
+            await User.revoke_access_tokens(session, user_id)
+            await session.commit()
 
-class AchievementAdmin(ModelView, model=Achievement):
+
+class AchievementAdmin(BaseModelView, model=Achievement):
     column_list = [
         "id",
         "name",
@@ -51,7 +136,7 @@ class AchievementAdmin(ModelView, model=Achievement):
     ]
 
 
-class AchievementAssignationAdmin(ModelView, model=AchievementAssignation):
+class AchievementAssignationAdmin(BaseModelView, model=AchievementAssignation):
     column_list = [
         "id",
         "user",
@@ -60,25 +145,50 @@ class AchievementAssignationAdmin(ModelView, model=AchievementAssignation):
     ]
 
 
-class ChallengeReportAdmin(ModelView, model=ChallengeResult):
+class ChallengeReportAdmin(BaseModelView, model=ChallengeResult):
     column_list = [
         "id",
         "member",
         "submitted_value",
-        "estimatino_value",
+        "estimation_value",
         "verification_value",
         "created_at",
     ]
+    column_filters = [
+        # the partition key, so filtered list touches one partition
+        ForeignKeyFilter(ChallengeResult.challenge_id, Challenge.name),
+    ]
     form_create_rules = [
         "member",
         "submitted_value",
-        "estimatino_value",
+        "estimation_value",
         "verification_value",
     ]
     form_edit_rules = form_create_rules
 
+    async def after_model_change(self, data, model, is_created, request):
+        # new results are folded by lifecycle updates, but values of
+        # folded ones may have been changed
+        await self._update_challenge(model.challenge_id, not is_created)
+
+    async def after_model_delete(self, model, request):
+        await self._update_challenge(model.challenge_id, True)
+
+    async def _update_challenge(self, challenge_id: int, is_stale: bool):
+        async with self.session_maker() as session:
+            if is_stale:
+                await session.execute(
+                    update(Challenge)
+                    .where(Challenge.id == challenge_id)
+                    .values(is_aggregation_stale=True)
+                )
+            await Challenge.discard_snapshot(session, challenge_id)
+            # cached challenges include active results
+            await notify_challenge_updated(session, challenge_id)
+            await session.commit()
 
-class ChallengeMemberAdmin(ModelView, model=ChallengeMember):
+
+class ChallengeMemberAdmin(BaseModelView, model=ChallengeMember):
     column_list = [
         "id",
         "user",
@@ -90,6 +200,10 @@ class ChallengeMemberAdmin(ModelView, model=ChallengeMember):
         "is_winner",
         "created_at",
     ]
+    column_filters = [
+        ForeignKeyFilter(ChallengeMember.challenge_id, Challenge.name),
+        BooleanFilter(ChallengeMember.is_winner),
+    ]
     create_template = [
         "user",
         "challenge",
@@ -97,9 +211,27 @@ class ChallengeMemberAdmin(ModelView, model=ChallengeMember):
         "is_participant",
         "is_administrator",
     ]
+    # maintained by lifecycle updates
+    form_excluded_columns = [
+        ChallengeMember.aggregation_state,
+    ]
 
+    async def after_model_change(self, data, model, is_created, request):
+        await self._update_challenge(model.challenge_id)
 
-class ChallengeAdmin(ModelView, model=Challenge):
+    async def after_model_delete(self, model, request):
+        await self._update_challenge(model.challenge_id)
+
+    async def _update_challenge(self, challenge_id: int):
+        async with self.session_maker() as session:
+            await Challenge.recount_participants(session, challenge_id)
+            await Challenge.discard_snapshot(session, challenge_id)
+            # cached challenges include members
+            await notify_challenge_updated(session, challenge_id)
+            await session.commit()
+
+
+class ChallengeAdmin(BaseModelView, model=Challenge):
     column_list = [
         Challenge.id,
         Challenge.space,
@@ -115,12 +247,33 @@ class ChallengeAdmin(ModelView, model=Challenge):
         Challenge.ends_at_determination_argument,
         Challenge.cached_current_progress,
         Challenge.results_aggregation_strategy,
+        Challenge.results_aggregation_argument,
         Challenge.prize_determination_fn,
         Challenge.prize_determination_argument,
         Challenge.created_at,
+    ]
+    column_details_exclude_list = [
         Challenge.members,
         Challenge.results,
     ]
+    column_filters = [
+        ForeignKeyFilter(Challenge.space_id, Space.name),
+    ]
+
+    async def after_model_change(self, data, model, is_created, request):
+        async with self.session_maker() as session:
+            if not is_created:
+                # the aggregation may be changed
+                await session.execute(
+                    update(Challenge)
+                    .where(Challenge.id == model.id)
+                    .values(is_aggregation_stale=True)
+                )
+                # finalized challenges are served from snapshots
+                await Challenge.discard_snapshot(session, model.id)
+            # deadlines may be changed, see `char_core.scheduling`
+            await notify_challenge_changed(session, model.id)
+            await session.commit()
 
     form_create_rules = [
         "space",
@@ -135,6 +288,7 @@ class ChallengeAdmin(ModelView, model=Challenge):
         "ends_at_determination_fn",
         "ends_at_determination_argument",
         "results_aggregation_strategy",
+        "results_aggregation_argument",
         "prize_determination_fn",
         "prize_determination_argument",
     ]
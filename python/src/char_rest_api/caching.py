@@ -0,0 +1,174 @@
+"""
+In-process cache of serialized challenges, invalidated across API
+processes by notifications, see `char_core.notifications`.
+"""
+from __future__ import annotations
+
+import asyncio
+import traceback
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from char_core.metrics import REGISTRY
+from char_core.notifications import (
+    CHALLENGE_CHANGED_CHANNEL,
+    CHALLENGE_UPDATED_CHANNEL,
+    listen,
+)
+
+CACHE_HITS = REGISTRY.counter(
+    "char_api_challenge_cache_hits_total",
+    "Challenges served from the in-process cache.",
+)
+CACHE_MISSES = REGISTRY.counter(
+    "char_api_challenge_cache_misses_total",
+    "Challenges not found in the in-process cache.",
+)
+CACHE_EVICTIONS = REGISTRY.counter(
+    "char_api_challenge_cache_evictions_total",
+    "Challenges evicted from the in-process cache by its size limits.",
+)
+CACHE_INVALIDATIONS = REGISTRY.counter(
+    "char_api_challenge_cache_invalidations_total",
+    "Notifications invalidating a cached challenge.",
+)
+CACHE_ENTRIES = REGISTRY.gauge(
+    "char_api_challenge_cache_entries",
+    "Challenges in the in-process cache.",
+)
+CACHE_BYTES = REGISTRY.gauge(
+    "char_api_challenge_cache_bytes",
+    "Size of serialized challenges in the in-process cache.",
+)
+
+_Generation = tuple[int, int]
+
+
+class ChallengeCache:
+    """
+    LRU cache of serialized `ChallengeFullDTO` by challenge id.
+
+    Every entry is stored with the generation of the challenge read
+    before loading it, and invalidation increments the generation, so
+    an entry loaded concurrently with a change is never served.
+    Changes which are not notified (e.g. of users) are served for
+    at most `ttl` seconds.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = timedelta(seconds=ttl)
+        self._entries: OrderedDict[
+            int, tuple[_Generation, datetime, bytes]
+        ] = OrderedDict()
+        self._bytes = 0
+        # incremented on reconnect of the listener, when notifications
+        # may have been missed
+        self._epoch = 0
+        # of invalidated challenges only, bounded by number of them
+        self._generations: dict[int, int] = {}
+        # nothing is cached while changes are not listened to
+        self.is_listening = False
+
+    def generation(self, challenge_id: int) -> _Generation:
+        return self._epoch, self._generations.get(challenge_id, 0)
+
+    def get(self, challenge_id: int) -> bytes | None:
+        entry = self._entries.get(challenge_id)
+        if entry is not None:
+            generation, expires_at, content = entry
+            if (generation == self.generation(challenge_id)
+                    and expires_at > datetime.now()):
+                self._entries.move_to_end(challenge_id)
+                CACHE_HITS.inc()
+                return content
+            self._remove(challenge_id)
+        CACHE_MISSES.inc()
+        return None
+
+    def put(
+            self,
+            challenge_id: int,
+            generation: _Generation,
+            content: bytes,
+            expires_at: datetime | None = None,
+    ):
+        """
+        :param generation: of the challenge before it was loaded
+        :param expires_at: moment the content becomes stale regardless
+         of notifications, e.g. when the challenge starts
+        """
+        if not self.is_listening:
+            return
+        if generation != self.generation(challenge_id):
+            return  # changed while loading
+        if not self.max_entries or len(content) > self.max_bytes:
+            return
+
+        deadline = datetime.now() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        self._remove(challenge_id)
+        self._entries[challenge_id] = (generation, deadline, content)
+        self._bytes += len(content)
+        while (len(self._entries) > self.max_entries
+               or self._bytes > self.max_bytes):
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            CACHE_EVICTIONS.inc()
+        self._update_gauges()
+
+    def invalidate(self, challenge_id: int):
+        self._generations[challenge_id] = (
+            self._generations.get(challenge_id, 0) + 1
+        )
+        self._remove(challenge_id)
+        CACHE_INVALIDATIONS.inc()
+
+    def clear(self):
+        self._epoch += 1
+        self._generations.clear()
+        self._entries.clear()
+        self._bytes = 0
+        self._update_gauges()
+
+    def _remove(self, challenge_id: int):
+        entry = self._entries.pop(challenge_id, None)
+        if entry is not None:
+            self._bytes -= len(entry[2])
+            self._update_gauges()
+
+    def _update_gauges(self):
+        CACHE_ENTRIES.set(len(self._entries))
+        CACHE_BYTES.set(self._bytes)
+
+
+async def listen_invalidations(engine: AsyncEngine, cache: ChallengeCache):
+    """Invalidate cached challenges changed by any process."""
+    def on_notification(payload: str):
+        cache.invalidate(int(payload))
+
+    while True:
+        disconnected = asyncio.Event()
+        try:
+            async with listen(
+                    engine=engine,
+                    channels=(CHALLENGE_CHANGED_CHANNEL,
+                              CHALLENGE_UPDATED_CHANNEL),
+                    callback=on_notification,
+                    on_disconnect=disconnected.set,
+            ):
+                # changes may have been missed while disconnected
+                cache.clear()
+                cache.is_listening = True
+                await disconnected.wait()
+        except Exception:
+            print("[rest-api]: listener of challenge changes failed")
+            print(traceback.format_exc())
+        finally:
+            cache.is_listening = False
+        cache.clear()
+        await asyncio.sleep(1)
@@ -0,0 +1,61 @@
+"""
+Coalescing of identical concurrent reads, so a burst of requests for
+the same resource costs one load.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+from char_core.metrics import REGISTRY
+from char_rest_api.deadlines import SharedDeadline
+
+COALESCED_CALLS = REGISTRY.counter(
+    "char_api_coalesced_calls_total",
+    "Calls served by a load already in flight for another request.",
+)
+
+_T = TypeVar("_T")
+
+
+class SingleFlight(Generic[_T]):
+    """
+    Calls with the same key made while the first one is in flight wait
+    for its result (or exception) instead of running their own.
+
+    The call runs in a separate task, so a cancelled request doesn't
+    cancel the load for others, under the loosest deadline of the
+    requests waiting for it, see `SharedDeadline`.  It must not use
+    resources of the request starting it, e.g. its session, which may
+    be closed before the load ends.  Keys must include everything the result depends on,
+    and authorization must be done before, by every request.
+    """
+
+    def __init__(self):
+        self._calls: dict[
+            Hashable, tuple[asyncio.Task[_T], SharedDeadline]
+        ] = {}
+
+    async def do(
+            self,
+            key: Hashable,
+            fn: Callable[[], Awaitable[_T]],
+    ) -> _T:
+        call = self._calls.get(key)
+        if call is not None:
+            task, deadline = call
+            deadline.join()
+            COALESCED_CALLS.inc()
+        else:
+            deadline = SharedDeadline()
+            task = asyncio.ensure_future(deadline.run(fn))
+            self._calls[key] = task, deadline
+            task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task[_T]):
+        call = self._calls.get(key)
+        if call is not None and call[0] is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if all callers are gone
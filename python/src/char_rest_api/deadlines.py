@@ -0,0 +1,274 @@
+"""
+Deadlines of requests and load shedding.
+
+Every request gets a deadline from the budget of its kind (reads or
+writes), transactions opened while handling it get `statement_timeout`
+of the remaining time, so a request never waits for postgres past its
+deadline, nor for a connection of the pool, see `DeadlinePool`.
+Requests exceeding the capacity of the connection pool by more than
+the allowed queue are rejected with 503 at once, instead of waiting in
+the pool and delaying everyone behind them.
+"""
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, TypeVar
+
+from dishka import AsyncContainer
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from char_core.metrics import REGISTRY
+
+SHED_READS = REGISTRY.counter(
+    "char_api_shed_reads_total",
+    "Read requests rejected as the connection pool was saturated.",
+)
+SHED_WRITES = REGISTRY.counter(
+    "char_api_shed_writes_total",
+    "Write requests rejected as the connection pool was saturated.",
+)
+DEADLINES_EXCEEDED = REGISTRY.counter(
+    "char_api_deadlines_exceeded_total",
+    "Requests which ran out of their budget while using the database.",
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "char_api_requests_in_flight",
+    "Requests being handled by this process.",
+)
+CONNECTIONS_CHECKED_OUT = REGISTRY.gauge(
+    "char_api_connections_checked_out",
+    "Connections checked out of the pools of this process.",
+)
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+# postgres error of statements cancelled by statement_timeout
+QUERY_CANCELED_SQLSTATE = "57014"
+
+_T = TypeVar("_T")
+
+
+class _Deadline:
+    def __init__(self, at: float | None):
+        # time.monotonic() moment, None when unbounded
+        self.at = at
+
+
+# by which the current request must be handled
+_deadline: ContextVar[_Deadline | None] = ContextVar("deadline", default=None)
+
+
+class LoadSheddingConfig(BaseModel):
+    read_budget_seconds: float = 5
+    write_budget_seconds: float = 15
+    # requests allowed to wait for a connection above the pool capacity,
+    # reads are shed first so writes still get connections
+    max_waiting_reads: int = 20
+    max_waiting_writes: int = 50
+
+
+def remaining() -> float | None:
+    """Seconds left until the deadline of the current request."""
+    deadline = _deadline.get()
+    if deadline is None or deadline.at is None:
+        return None
+    return deadline.at - time.monotonic()
+
+
+class SharedDeadline(_Deadline):
+    """
+    Deadline of a load shared by requests, the loosest of theirs, so
+    the load isn't cut short by the deadline of the request starting
+    it while others still wait for it.  Transactions get the remaining
+    time when they begin, so joining extends only later ones.
+    """
+
+    def __init__(self):
+        current = _deadline.get()
+        super().__init__(current.at if current is not None else None)
+
+    def join(self):
+        """Extend the deadline by the one of the current request."""
+        if self.at is None:
+            return
+        current = _deadline.get()
+        if current is None or current.at is None:
+            self.at = None
+        else:
+            self.at = max(self.at, current.at)
+
+    async def run(self, fn: Callable[[], Awaitable[_T]]) -> _T:
+        """Run the load under this deadline instead of the request's."""
+        token = _deadline.set(self)
+        try:
+            return await fn()
+        finally:
+            _deadline.reset(token)
+
+
+class DeadlinePool(AsyncAdaptedQueuePool):
+    """
+    Waits for a connection at most until the deadline of the current
+    request, `pool_timeout` still bounds waits outside of requests.
+    """
+
+    class _Queue(AsyncAdaptedQueue):
+        def get(self, block=True, timeout=None):
+            seconds = remaining()
+            if block and seconds is not None:
+                seconds = max(seconds, 0)
+                timeout = seconds if timeout is None else min(timeout, seconds)
+            return super().get(block, timeout)
+
+    _queue_class = _Queue
+
+
+class _PoolUsage:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.checked_out = 0
+
+
+class LoadShedder:
+    """
+    Counts requests handled by this process and connections checked
+    out of the watched pools, see `watch`.  While any pool is
+    saturated, requests without a connection are considered waiting
+    for one.
+    """
+
+    def __init__(self, config: LoadSheddingConfig):
+        self.config = config
+        self.in_flight = 0
+        self._pools: list[_PoolUsage] = []
+
+    def watch(self, pool: Pool, capacity: int):
+        usage = _PoolUsage(capacity)
+        self._pools.append(usage)
+
+        def on_checkout(dbapi_connection, connection_record, proxy):
+            usage.checked_out += 1
+            CONNECTIONS_CHECKED_OUT.set(self.checked_out)
+
+        def on_checkin(dbapi_connection, connection_record):
+            usage.checked_out -= 1
+            CONNECTIONS_CHECKED_OUT.set(self.checked_out)
+
+        event.listen(pool, "checkout", on_checkout)
+        event.listen(pool, "checkin", on_checkin)
+
+    @property
+    def checked_out(self) -> int:
+        return sum(usage.checked_out for usage in self._pools)
+
+    @property
+    def is_saturated(self) -> bool:
+        return any(
+            usage.checked_out >= usage.capacity for usage in self._pools
+        )
+
+    def try_enter(self, is_read: bool) -> bool:
+        if is_read:
+            max_waiting = self.config.max_waiting_reads
+        else:
+            max_waiting = self.config.max_waiting_writes
+        # a request may hold connections of several pools, e.g. of the
+        # rate limits, so this undercounts rather than overcounts
+        waiting = self.in_flight - self.checked_out
+        if self.is_saturated and waiting >= max_waiting:
+            (SHED_READS if is_read else SHED_WRITES).inc()
+            return False
+        self.in_flight += 1
+        REQUESTS_IN_FLIGHT.set(self.in_flight)
+        return True
+
+    def leave(self):
+        self.in_flight -= 1
+        REQUESTS_IN_FLIGHT.set(self.in_flight)
+
+
+class DeadlineMiddleware:
+    """
+    Sets the deadline of every request and sheds requests by
+    `LoadShedder`, resolved from the container on the first request.
+    """
+
+    def __init__(self, app, container: AsyncContainer):
+        self.app = app
+        self.container = container
+        self._load_shedder: LoadShedder | None = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self._load_shedder is None:
+            self._load_shedder = await self.container.get(LoadShedder)
+        load_shedder = self._load_shedder
+        config = load_shedder.config
+
+        is_read = scope["method"] in READ_METHODS
+        if not load_shedder.try_enter(is_read):
+            response = JSONResponse(
+                {"detail": "Service is overloaded."},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        if is_read:
+            budget = config.read_budget_seconds
+        else:
+            budget = config.write_budget_seconds
+        token = _deadline.set(_Deadline(time.monotonic() + budget))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _deadline.reset(token)
+            load_shedder.leave()
+
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    # every session, including ones opened by shared loads, which
+    # inherit the context of the request starting them
+    seconds = remaining()
+    if seconds is None:
+        return  # not in a request, e.g. in the daemon
+    if seconds <= 0:
+        DEADLINES_EXCEEDED.inc()
+        raise HTTPException(status_code=503, detail="Deadline exceeded.")
+    connection.exec_driver_sql(
+        f"set local statement_timeout = {max(int(seconds * 1000), 1)}",
+    )
+
+
+async def handle_query_canceled(request: Request, exc: DBAPIError):
+    if getattr(exc.orig, "sqlstate", None) != QUERY_CANCELED_SQLSTATE:
+        raise exc
+    DEADLINES_EXCEEDED.inc()
+    return JSONResponse(
+        {"detail": "Deadline exceeded."},
+        status_code=503,
+        headers={"Retry-After": "1"},
+    )
+
+
+async def handle_pool_timeout(request: Request, exc: PoolTimeoutError):
+    # no connection was returned to the pool until the deadline
+    DEADLINES_EXCEEDED.inc()
+    return JSONResponse(
+        {"detail": "Deadline exceeded."},
+        status_code=503,
+        headers={"Retry-After": "1"},
+    )
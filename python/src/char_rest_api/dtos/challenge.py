@@ -46,6 +46,10 @@ class ChallengeFullDTO(ChallengeDTO):
     ends_at_determination_fn: SelectionFnEnum | None
     ends_at_determination_argument: float | None
     results_aggregation_strategy: AggregationStrategy
+    results_aggregation_argument: float | None = Field(
+        default=None,
+        description="Percentile of PERCENTILE aggregation",
+    )
     prize_determination_fn: SelectionFnEnum
     prize_determination_argument: float
     members: list[ChallengeMemberDTO]
@@ -62,3 +66,71 @@ class ChallengeResultDTO(BaseDTO):
     verification_value: float | None = Field(
         description="May be assigned by administrator",
     )
+
+
+class ChallengeHistoryPointDTO(BaseDTO):
+    bucket_start: datetime
+    results_count: int
+    values_sum: float
+    values_min: float | None
+    values_max: float | None
+    progress: int | None = Field(
+        default=None,
+        description="Snapshot of the challenge current progress, "
+                    "not present in member history",
+    )
+
+
+class ChallengeRankNeighbourDTO(BaseDTO):
+    member_id: int
+    user_id: int
+    aggregated_result: float
+
+
+class ChallengeRankDTO(BaseDTO):
+    member_id: int
+    aggregated_result: float
+    rank: int = Field(
+        description="1 + number of participants with better results, "
+                    "participants with equal results share the rank",
+    )
+    participants_count: int
+    gap_to_next: float | None = Field(
+        description="Distance to the closest better result, "
+                    "not present for the leaders",
+    )
+    ahead: list[ChallengeRankNeighbourDTO] = Field(
+        description="Closest participants with better results, "
+                    "best first.  Participants with equal results "
+                    "are neither ahead nor behind",
+    )
+    behind: list[ChallengeRankNeighbourDTO] = Field(
+        description="Closest participants with worse results, "
+                    "best first.  Participants with equal results "
+                    "are neither ahead nor behind",
+    )
+
+
+class ChallengePercentileDTO(BaseDTO):
+    percentile: float
+    value: float
+
+
+class ChallengeHistogramBinDTO(BaseDTO):
+    lower: float
+    upper: float
+    results_count: int
+
+
+class ChallengeDistributionDTO(BaseDTO):
+    results_count: int
+    values_min: float | None
+    values_max: float | None
+    relative_accuracy: float = Field(
+        description="Upper bound of the relative error of percentiles",
+    )
+    percentiles: list[ChallengePercentileDTO]
+    histogram: list[ChallengeHistogramBinDTO] = Field(
+        description="Equal width bins between the lowest and the highest "
+                    "values, empty if there are no active results",
+    )
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from datetime import datetime
 
+from pydantic import Field
+
 from char_rest_api.dtos.base import BaseDTO
 
 
@@ -13,7 +15,31 @@ class UserDTO(BaseDTO):
 
 
 class UserFullDTO(UserDTO):
-    pass
+    statistics: UserStatisticsDTO | None = Field(
+        default=None,
+        description="Not present until the next refresh of statistics",
+    )
+
+
+class UserProfileDTO(BaseDTO):
+    id: int
+    full_name: str
+    description: str | None
+    statistics: UserStatisticsDTO | None = Field(
+        default=None,
+        description="Not present until the next refresh of statistics",
+    )
+
+
+class UserStatisticsDTO(BaseDTO):
+    challenges_count: int
+    wins_count: int
+    achievements_count: int
+    spaces_count: int
+    best_place: int | None = Field(
+        description="Best place among participants of finalized challenges",
+    )
+    refreshed_at: datetime
 
 
 class AchievementAssignationDTO(BaseDTO):
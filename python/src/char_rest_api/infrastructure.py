@@ -1,5 +1,12 @@
 from datetime import timedelta
-from typing import AsyncIterable, Iterable, Annotated, TypeAlias
+from typing import (
+    AsyncIterable,
+    Iterable,
+    Annotated,
+    TypeAlias,
+    NewType,
+    Literal,
+)
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
@@ -8,7 +15,7 @@ from authx import AuthX, AuthXConfig, TokenPayload
 from dishka import Provider, provide, Scope, FromComponent, from_context
 from pydantic import BaseModel
 from pydantic_settings import SettingsConfigDict, BaseSettings
-from sqlalchemy import Engine, create_engine
+from sqlalchemy import Engine, create_engine, event
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     create_async_engine,
@@ -18,28 +25,75 @@ from sqlalchemy.orm import Session
 from starlette.requests import Request
 
 from char_core.models.user import User
+from char_rest_api.caching import ChallengeCache
+from char_rest_api.coalescing import SingleFlight
+from char_rest_api.deadlines import (
+    DeadlinePool,
+    LoadShedder,
+    LoadSheddingConfig,
+)
+from char_rest_api.principal import Principal, TokenVersions
+from char_rest_api.replication import (
+    get_pinned_lsn,
+    get_replay_lsn,
+    require_pin,
+    requires_primary,
+)
+from char_rest_api.rate_limiting import (
+    MemoryTokenBucketStore,
+    PostgresTokenBucketStore,
+    RateLimiter,
+    TokenBucketLimit,
+)
 
 
 AccessTokenPayload: TypeAlias = TokenPayload
 
+# engine, session and user of read only handlers, bound to the replica
+# when it is configured
+ReadOnlyAsyncEngine = NewType("ReadOnlyAsyncEngine", AsyncEngine)
+ReadOnlyAsyncSession = NewType("ReadOnlyAsyncSession", AsyncSession)
+ReadOnlyUser = NewType("ReadOnlyUser", User)
+
 
 openapi_auth_dep = Depends(OAuth2PasswordBearer(tokenUrl="token"))
 
 
+class PostgresReplicaConfig(BaseModel):
+    host: str
+    port: int
+
+
 class PostgresConfig(BaseModel):
     host: str
     port: int
     user: str
     password: str
     database: str
-
-    def get_sqlalchemy_url(self, driver: str):
+    replica: PostgresReplicaConfig | None = None
+    # reads of a client are served by the primary after its commit
+    # until the replica replays it, but at most for this time, see
+    # `char_rest_api.replication`
+    replica_pin_seconds: float = 5
+    # of every engine, pools at capacity make
+    # `char_rest_api.deadlines.LoadShedder` shed requests; waits for
+    # connections are also bounded by deadlines of requests
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout_seconds: float = 30
+
+    @property
+    def pool_capacity(self) -> int:
+        return self.pool_size + self.max_overflow
+
+    def get_sqlalchemy_url(self, driver: str, replica: bool = False):
+        server = self.replica if replica else self
         return "postgresql+{}://{}:{}@{}:{}/{}".format(
             driver,
             self.user,
             self.password,
-            self.host,
-            self.port,
+            server.host,
+            server.port,
             self.database,
         )
 
@@ -48,16 +102,61 @@ class AdminConfig(BaseModel):
     secret_key: str
     username: str
     password: str
+    # port of the standalone admin panel, see `char-admin`
+    port: int = 80
+
+
+class RateLimitConfig(BaseModel):
+    # "postgres" shares buckets between API processes
+    store: Literal["memory", "postgres"] = "memory"
+    # by names of `rate_limit` dependencies of routes, a route is not
+    # limited when its limit is missing
+    limits: dict[str, TokenBucketLimit] = {
+        "write": TokenBucketLimit(capacity=30, refill_per_second=1),
+        "submit-result": TokenBucketLimit(capacity=10, refill_per_second=1),
+    }
 
 
 class RestAPIConfig(BaseModel):
     jwt_secret: str
+    access_token_lifetime: timedelta = timedelta(days=3)
+    refresh_token_lifetime: timedelta = timedelta(days=30)
+    # embed space roles into access tokens, so authorization of most
+    # requests does not query the database
+    embed_claims: bool = False
+    # disable to serve the admin panel by the separate `char-admin`
+    # process and keep sqladmin off the API startup
+    mount_admin: bool = True
+    token_version_cache_seconds: float = 30
+    # in-process cache of challenges, see `char_rest_api.caching`
+    challenge_cache_entries: int = 1000
+    challenge_cache_bytes: int = 64 * 1024 * 1024
+    challenge_cache_seconds: float = 60
+    rate_limit: RateLimitConfig = RateLimitConfig()
+    load_shedding: LoadSheddingConfig = LoadSheddingConfig()
+    # serve prometheus metrics of the process on the port when set,
+    # apart from the public API
+    metrics_port: int | None = None
+
+
+class DaemonConfig(BaseModel):
+    # challenges processed at once, each holds a connection of the pool
+    concurrency: int = 4
+    # pause between sweeps over not finalized challenges, also the
+    # period of the lifecycle check of every challenge across replicas
+    interval_seconds: float = 1
+    # a sweep claims at most claim_batch_size * concurrency challenges
+    claim_batch_size: int = 100
+    user_statistics_refresh_seconds: float = 60
+    # serve prometheus metrics of the daemon on the port when set
+    metrics_port: int | None = None
 
 
 class CharConfig(BaseSettings):
     postgres: PostgresConfig = None
     rest_api: RestAPIConfig = None
     admin: AdminConfig = None
+    daemon: DaemonConfig = DaemonConfig()
 
     model_config = SettingsConfigDict(
         env_nested_delimiter="__",
@@ -102,6 +201,13 @@ class InfrastructureProvider(Provider):
 
         return config.rest_api
 
+    @provide(scope=Scope.APP)
+    def get_daemon_config(
+            self,
+            config: CharConfig,
+    ) -> DaemonConfig:
+        return config.daemon
+
     @provide(scope=Scope.APP)
     async def get_async_engine(
             self,
@@ -109,19 +215,65 @@ class InfrastructureProvider(Provider):
     ) -> AsyncEngine:
         return create_async_engine(
             postgres_config.get_sqlalchemy_url("asyncpg"),
+            pool_size=postgres_config.pool_size,
+            max_overflow=postgres_config.max_overflow,
+            pool_timeout=postgres_config.pool_timeout_seconds,
+            poolclass=DeadlinePool,
         )
 
+    @provide(scope=Scope.APP)
+    async def get_read_only_async_engine(
+            self,
+            postgres_config: PostgresConfig,
+            engine: AsyncEngine,
+    ) -> ReadOnlyAsyncEngine:
+        if postgres_config.replica is None:
+            return ReadOnlyAsyncEngine(engine)
+
+        return ReadOnlyAsyncEngine(create_async_engine(
+            postgres_config.get_sqlalchemy_url("asyncpg", replica=True),
+            pool_size=postgres_config.pool_size,
+            max_overflow=postgres_config.max_overflow,
+            pool_timeout=postgres_config.pool_timeout_seconds,
+            poolclass=DeadlinePool,
+        ))
+
     @provide(scope=Scope.REQUEST)
     async def get_async_session(
             self,
             engine: AsyncEngine,
+            postgres_config: PostgresConfig,
     ) -> AsyncIterable[AsyncSession]:
         async with AsyncSession(
             bind=engine,
             expire_on_commit=False,
         ) as session:
+            if postgres_config.replica is not None:
+                @event.listens_for(session.sync_session, "after_commit")
+                def pin_client(_):
+                    require_pin()
+
             yield session
 
+    @provide(scope=Scope.REQUEST)
+    async def get_read_only_async_session(
+            self,
+            engine: AsyncEngine,
+            read_only_engine: ReadOnlyAsyncEngine,
+            request: Request,
+    ) -> AsyncIterable[ReadOnlyAsyncSession]:
+        pinned_lsn = get_pinned_lsn(request)
+        if pinned_lsn is not None and read_only_engine is not engine:
+            replay_lsn = await get_replay_lsn(read_only_engine)
+            if requires_primary(pinned_lsn, replay_lsn):
+                read_only_engine = engine
+
+        async with AsyncSession(
+            bind=read_only_engine,
+            expire_on_commit=False,
+        ) as session:
+            yield ReadOnlyAsyncSession(session)
+
     @provide(scope=Scope.APP)
     def get_sync_engine(
             self,
@@ -150,7 +302,8 @@ class InfrastructureProvider(Provider):
         authx_config = AuthXConfig(
             JWT_ALGORITHM="HS256",
             JWT_SECRET_KEY=rest_api_config.jwt_secret,
-            JWT_ACCESS_TOKEN_EXPIRES=timedelta(days=3),
+            JWT_ACCESS_TOKEN_EXPIRES=rest_api_config.access_token_lifetime,
+            JWT_REFRESH_TOKEN_EXPIRES=rest_api_config.refresh_token_lifetime,
         )
         return AuthX(
             config=authx_config,
@@ -166,16 +319,103 @@ class InfrastructureProvider(Provider):
     ) -> AccessTokenPayload:
         return await security.access_token_required(request)
 
+    @provide(scope=Scope.APP)
+    def get_token_versions(
+            self,
+            rest_api_config: RestAPIConfig,
+    ) -> TokenVersions:
+        return TokenVersions(rest_api_config.token_version_cache_seconds)
+
+    @provide(scope=Scope.APP)
+    def get_challenge_cache(
+            self,
+            rest_api_config: RestAPIConfig,
+    ) -> ChallengeCache:
+        return ChallengeCache(
+            max_entries=rest_api_config.challenge_cache_entries,
+            max_bytes=rest_api_config.challenge_cache_bytes,
+            ttl=rest_api_config.challenge_cache_seconds,
+        )
+
+    @provide(scope=Scope.APP)
+    def get_rate_limiter(
+            self,
+            rest_api_config: RestAPIConfig,
+            engine: AsyncEngine,
+    ) -> RateLimiter:
+        config = rest_api_config.rate_limit
+        if config.store == "postgres":
+            store = PostgresTokenBucketStore(engine)
+        else:
+            store = MemoryTokenBucketStore()
+        return RateLimiter(config.limits, store)
+
+    @provide(scope=Scope.APP)
+    def get_load_shedder(
+            self,
+            rest_api_config: RestAPIConfig,
+            postgres_config: PostgresConfig,
+            engine: AsyncEngine,
+            read_only_engine: ReadOnlyAsyncEngine,
+    ) -> LoadShedder:
+        load_shedder = LoadShedder(config=rest_api_config.load_shedding)
+        load_shedder.watch(
+            engine.sync_engine.pool,
+            capacity=postgres_config.pool_capacity,
+        )
+        if read_only_engine is not engine:
+            load_shedder.watch(
+                read_only_engine.sync_engine.pool,
+                capacity=postgres_config.pool_capacity,
+            )
+        return load_shedder
+
+    @provide(scope=Scope.APP)
+    def get_single_flight(self) -> SingleFlight:
+        return SingleFlight()
+
     @provide(scope=Scope.REQUEST)
-    async def get_user(
+    async def get_principal(
             self,
+            access_token_payload: AccessTokenPayload,
+            session: ReadOnlyAsyncSession,
+            token_versions: TokenVersions,
+    ) -> Principal:
+        principal = Principal.from_token_payload(access_token_payload)
+        await token_versions.ensure_current(session, principal)
+        return principal
+
+    @staticmethod
+    async def _load_user(
             access_token_payload: AccessTokenPayload,
             session: AsyncSession,
     ) -> User:
-        user = await session.get(User, int(access_token_payload.sub))
+        principal = Principal.from_token_payload(access_token_payload)
+        user = await session.get(User, principal.id)
         if user is None:
             raise HTTPException(
                 401,
                 detail="Current user does not exists.",
             )
+        # the user is loaded anyway, so checked without `TokenVersions`
+        if principal.token_version != user.token_version:
+            raise HTTPException(401, detail="Token revoked.")
         return user
+
+    @provide(scope=Scope.REQUEST)
+    async def get_user(
+            self,
+            access_token_payload: AccessTokenPayload,
+            session: AsyncSession,
+    ) -> User:
+        return await self._load_user(access_token_payload, session)
+
+    @provide(scope=Scope.REQUEST)
+    async def get_read_only_user(
+            self,
+            access_token_payload: AccessTokenPayload,
+            session: ReadOnlyAsyncSession,
+    ) -> ReadOnlyUser:
+        return ReadOnlyUser(
+            await self._load_user(access_token_payload, session),
+        )
@@ -0,0 +1,53 @@
+from contextlib import asynccontextmanager
+
+from dishka import make_async_container
+from fastapi import FastAPI
+from uvicorn import run
+
+from char_rest_api.admin import setup_admin
+from char_rest_api.infrastructure import (
+    InfrastructureProvider,
+    CharConfig,
+)
+from char_rest_api.startup import StartupTimings
+
+
+def main():
+    """
+    Serve the admin panel alone, for deployments with
+    `CHAR__REST_API__MOUNT_ADMIN=false`.
+    """
+    timings = StartupTimings("admin")
+    timings.record_imports()
+
+    dependency_providers = (InfrastructureProvider(),)
+    container = make_async_container(*dependency_providers)
+
+    @asynccontextmanager
+    async def lifespan(current_app: FastAPI):
+        with timings.phase("admin"):
+            await setup_admin(container, current_app)
+
+        timings.report()
+
+        yield
+
+        await container.close()
+
+    app = FastAPI(
+        lifespan=lifespan,
+        root_path="/api",
+        title="CHAR admin",
+        openapi_url=None,
+    )
+
+    config = CharConfig()
+    if config.admin is None:
+        raise RuntimeError("Admin panel configuration not found")
+
+    run(
+        app,
+        host="0.0.0.0",
+        port=config.admin.port,
+        forwarded_allow_ips="*",  # todo: adjust [sec]
+    )
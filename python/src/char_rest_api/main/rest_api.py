@@ -1,36 +1,93 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from dishka import make_async_container
 from dishka.integrations.fastapi import setup_dishka
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
 from uvicorn import run
 
+from char_core.metrics import start_metrics_server
 from char_rest_api import routers
-from char_rest_api.admin import setup_admin
+from char_rest_api.caching import ChallengeCache, listen_invalidations
+from char_rest_api.deadlines import (
+    DeadlineMiddleware,
+    handle_pool_timeout,
+    handle_query_canceled,
+)
 from char_rest_api.infrastructure import (
     InfrastructureProvider,
+    RestAPIConfig,
 )
+from char_rest_api.replication import ReplicaPinMiddleware
+from char_rest_api.startup import StartupTimings
 
 
 def main():
+    timings = StartupTimings("rest-api")
+    timings.record_imports()
+
     dependency_providers = (InfrastructureProvider(),)
     container = make_async_container(*dependency_providers)
 
     @asynccontextmanager
     async def lifespan(current_app: FastAPI):
-        await setup_admin(container, current_app)
+        with timings.phase("config"):
+            rest_api_config = await container.get(RestAPIConfig)
+
+        if rest_api_config.mount_admin:
+            with timings.phase("admin"):
+                # sqladmin is imported only when the admin panel is served
+                # by this process, see `char-admin`
+                from char_rest_api.admin import setup_admin
+                await setup_admin(container, current_app)
+
+        with timings.phase("cache"):
+            listener = asyncio.create_task(listen_invalidations(
+                engine=await container.get(AsyncEngine),
+                cache=await container.get(ChallengeCache),
+            ))
+
+        metrics_server = None
+        if rest_api_config.metrics_port is not None:
+            metrics_server = await start_metrics_server(
+                rest_api_config.metrics_port,
+            )
+
+        timings.report()
 
         yield
 
+        if metrics_server is not None:
+            metrics_server.close()
+        listener.cancel()
         await app.state.dishka_container.close()
 
+    with timings.phase("app"):
+        app = _create_app(container, lifespan)
+
+    run(
+        app,
+        host="0.0.0.0",
+        port=80,
+        forwarded_allow_ips="*",  # todo: adjust [sec]
+    )
+
+
+def _create_app(container, lifespan) -> FastAPI:
     app = FastAPI(
         lifespan=lifespan,
         root_path="/api",
         title="CHAR",
         description="The challenges arena API.",
     )
+    # inside of CORS, so rejections have its headers
+    app.add_middleware(ReplicaPinMiddleware, container=container)
+    app.add_middleware(DeadlineMiddleware, container=container)
+    app.add_exception_handler(DBAPIError, handle_query_canceled)
+    app.add_exception_handler(PoolTimeoutError, handle_pool_timeout)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],  # todo: adjust [sec]
@@ -43,9 +100,4 @@ def main():
 
     app.include_router(routers.router)
 
-    run(
-        app,
-        host="0.0.0.0",
-        port=80,
-        forwarded_allow_ips="*",  # todo: adjust [sec]
-    )
+    return app
@@ -0,0 +1,143 @@
+"""
+Lightweight authorization without loading the `User`.
+
+Access tokens always carry the `ver` claim, the `User.token_version`
+at the moment of issuing, and may carry space roles of the user
+(see `RestAPIConfig.embed_claims`).  Bumping the version revokes all
+issued access tokens of the user.
+"""
+import time
+
+from authx import TokenPayload
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from char_core.exceptions import AccessDenied
+from char_core.models.space import SpaceMember
+from char_core.models.user import User
+
+# tokens of users with more spaces fall back to the database checks
+MAX_EMBEDDED_SPACES = 100
+
+
+class Principal(BaseModel):
+    id: int
+    token_version: int
+    # None when roles were not embedded into the token
+    spaces: frozenset[int] | None = None
+    administered_spaces: frozenset[int] = frozenset()
+
+    @classmethod
+    def from_token_payload(cls, payload: TokenPayload) -> "Principal":
+        claims = payload.model_extra or {}
+        spaces = claims.get("spaces")
+        return cls(
+            id=int(payload.sub),
+            token_version=claims.get("ver", 0),
+            spaces=None if spaces is None else frozenset(spaces),
+            administered_spaces=frozenset(claims.get("admin_spaces", ())),
+        )
+
+    async def ensure_space_access(
+            self,
+            session: AsyncSession,
+            space_id: int,
+            edit: bool = False,
+    ):
+        """
+        Same as `Space.ensure_access`, but read access is served from
+        the claims when they are sufficient.  Roles granted after the
+        token was issued are found by the fallback query, revoked ones
+        revoke the tokens, see `SpaceMemberAdmin`.  Edits are always
+        checked against the database.
+        """
+        if not edit and self.spaces is not None and space_id in self.spaces:
+            return
+
+        stmt = (
+            select(SpaceMember.is_administrator)
+            .where(SpaceMember.user_id == self.id)
+            .where(SpaceMember.space_id == space_id)
+        )
+        is_administrator = await session.scalar(stmt)
+        if is_administrator is None:
+            raise AccessDenied()
+        if edit and not is_administrator:
+            raise AccessDenied()
+
+
+async def get_access_token_claims(
+        session: AsyncSession,
+        user_id: int,
+        embed_spaces: bool,
+) -> dict:
+    token_version = await session.scalar(
+        select(User.token_version).where(User.id == user_id)
+    )
+    claims = dict(ver=token_version)
+    if not embed_spaces:
+        return claims
+
+    stmt = (
+        select(SpaceMember.space_id, SpaceMember.is_administrator)
+        .where(SpaceMember.user_id == user_id)
+        .limit(MAX_EMBEDDED_SPACES + 1)
+    )
+    memberships = list(await session.execute(stmt))
+    if len(memberships) <= MAX_EMBEDDED_SPACES:
+        claims["spaces"] = [i.space_id for i in memberships]
+        claims["admin_spaces"] = [
+            i.space_id for i in memberships if i.is_administrator
+        ]
+    return claims
+
+
+class TokenVersions:
+    """
+    In-process cache of `User.token_version`, so principals are checked
+    against the user table at most once per `ttl_seconds` per user.
+    Revocation takes effect within that time.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._versions: dict[int, tuple[int, float]] = {}
+
+    async def get(self, session: AsyncSession, user_id: int) -> int | None:
+        now = time.monotonic()
+        cached = self._versions.get(user_id)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+
+        version = await session.scalar(
+            select(User.token_version).where(User.id == user_id)
+        )
+        if version is None:
+            self._versions.pop(user_id, None)
+            return None
+
+        if len(self._versions) > 10_000:
+            self._versions = {
+                k: v for k, v in self._versions.items() if v[1] > now
+            }
+        self._versions[user_id] = (version, now + self.ttl_seconds)
+        return version
+
+    def forget(self, user_id: int):
+        self._versions.pop(user_id, None)
+
+    async def ensure_current(
+            self,
+            session: AsyncSession,
+            principal: Principal,
+    ):
+        version = await self.get(session, principal.id)
+        if version is None:
+            raise HTTPException(
+                401,
+                detail="Current user does not exists.",
+            )
+        if principal.token_version != version:
+            raise HTTPException(401, detail="Token revoked.")
@@ -0,0 +1,150 @@
+"""
+Token bucket rate limits of users, checked by a route dependency before
+the handler opens any session, see `rate_limit`.
+"""
+from __future__ import annotations
+
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from authx import TokenPayload
+from fastapi import Depends, HTTPException
+from pydantic import BaseModel
+from sqlalchemy import func, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.requests import Request
+
+from char_core.metrics import REGISTRY
+from char_core.models.rate_limit import RateLimitBucket
+
+RATE_LIMITED = REGISTRY.counter(
+    "char_api_rate_limited_total",
+    "Requests rejected by rate limits.",
+)
+
+
+class TokenBucketLimit(BaseModel):
+    # requests allowed at once
+    capacity: float
+    # sustained requests per second
+    refill_per_second: float
+
+
+class TokenBucketStore(ABC):
+    @abstractmethod
+    async def take(self, key: str, limit: TokenBucketLimit) -> bool:
+        """Take a token from the bucket, False if it is empty."""
+        raise NotImplementedError
+
+
+class MemoryTokenBucketStore(TokenBucketStore):
+    """
+    Buckets of this process, so limits are per API process.  At most
+    `max_buckets` least recently used buckets are kept.
+    """
+
+    def __init__(self, max_buckets: int = 10_000):
+        self.max_buckets = max_buckets
+        # key -> (tokens, updated at)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key, limit):
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (limit.capacity, now))
+        tokens = min(
+            limit.capacity,
+            tokens + (now - updated_at) * limit.refill_per_second,
+        )
+        if tokens >= 1:
+            tokens -= 1
+            is_taken = True
+        else:
+            is_taken = False
+        self._buckets[key] = (tokens, now)
+
+        if len(self._buckets) > self.max_buckets:
+            # a tenth at once, so eviction isn't paid by every request
+            for _ in range(max(self.max_buckets // 10, 1)):
+                self._buckets.popitem(last=False)
+        return is_taken
+
+
+class PostgresTokenBucketStore(TokenBucketStore):
+    """
+    Buckets shared by API processes, one statement per request.
+    The table is unlogged, buckets are lost on a crash of postgres,
+    which only resets limits.
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    async def take(self, key, limit):
+        table = RateLimitBucket.__table__
+        now = func.clock_timestamp()
+        elapsed = func.extract("epoch", now - table.c.updated_at)
+        refilled = func.least(
+            literal(limit.capacity),
+            table.c.tokens + elapsed * limit.refill_per_second,
+        )
+        stmt = insert(table).values(
+            key=key,
+            tokens=limit.capacity - 1,
+            updated_at=now,
+        )
+        stmt = (
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_=dict(tokens=refilled - 1, updated_at=now),
+                # the bucket is left intact when empty
+                where=refilled >= 1,
+            )
+            .returning(table.c.key)
+        )
+        async with self.engine.begin() as connection:
+            return await connection.scalar(stmt) is not None
+
+
+class RateLimiter:
+    def __init__(
+            self,
+            limits: dict[str, TokenBucketLimit],
+            store: TokenBucketStore,
+    ):
+        self.limits = limits
+        self.store = store
+
+    async def ensure_allowed(self, name: str, subject: str):
+        limit = self.limits.get(name)
+        if limit is None:
+            return  # not configured
+
+        if await self.store.take(f"{name}:{subject}", limit):
+            return
+        RATE_LIMITED.inc()
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests.",
+            headers={
+                "Retry-After": str(math.ceil(1 / limit.refill_per_second)),
+            },
+        )
+
+
+def rate_limit(name: str):
+    """
+    Dependency of the route limiting requests of every user by the
+    limit with the name, see `RateLimitConfig`.
+    """
+    async def dependency(request: Request):
+        # the request container of dishka, both are resolved without
+        # a session.  TokenPayload is `AccessTokenPayload`
+        container = request.state.dishka_container
+        access_token_payload = await container.get(TokenPayload)
+        rate_limiter = await container.get(RateLimiter)
+        await rate_limiter.ensure_allowed(name, access_token_payload.sub)
+
+    return Depends(dependency)
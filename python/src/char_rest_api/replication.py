@@ -0,0 +1,133 @@
+"""
+Read-your-writes for handlers routed to the replica.
+
+A response to a request which committed into the primary carries the
+WAL position of the primary after the commit, as a cookie and as a
+header.  Later reads of the client carrying it (either of them) are
+routed to the primary until the replica replays up to the position,
+so the pin follows the client across API processes.
+"""
+from __future__ import annotations
+
+from contextvars import ContextVar
+
+from dishka import AsyncContainer
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+
+REPLICA_LSN_COOKIE = "char_replica_lsn"
+REPLICA_LSN_HEADER = "X-Char-Replica-LSN"
+
+
+class _Pin:
+    required = False
+
+
+# of the current request, see `require_pin`
+_pin: ContextVar[_Pin | None] = ContextVar("replica_pin", default=None)
+
+
+def require_pin():
+    """
+    Pin the client of the current request to the primary, called after
+    commits into it.  Does nothing outside of requests.
+    """
+    pin = _pin.get()
+    if pin is not None:
+        pin.required = True
+
+
+def parse_lsn(value: str) -> int | None:
+    """Position of `pg_lsn` text representation, e.g. 16/B374D848."""
+    high, separator, low = value.partition("/")
+    if not separator:
+        return None
+    try:
+        return (int(high, 16) << 32) + int(low, 16)
+    except ValueError:
+        return None
+
+
+def get_pinned_lsn(request: Request) -> int | None:
+    """Position the client must read up to, the header wins."""
+    value = request.headers.get(REPLICA_LSN_HEADER)
+    if value is None:
+        value = request.cookies.get(REPLICA_LSN_COOKIE)
+    if value is None:
+        return None
+    return parse_lsn(value)
+
+
+def requires_primary(pinned_lsn: int | None, replay_lsn: str | None) -> bool:
+    """
+    Whether a read of the client must be served by the primary.
+
+    :param replay_lsn: `pg_last_wal_replay_lsn()` of the replica, None
+     when it is not in recovery (e.g. it is promoted)
+    """
+    if pinned_lsn is None:
+        return False
+    if replay_lsn is None:
+        return True
+    replayed = parse_lsn(replay_lsn)
+    return replayed is None or replayed < pinned_lsn
+
+
+async def get_replay_lsn(engine: AsyncEngine) -> str | None:
+    async with engine.connect() as connection:
+        return await connection.scalar(
+            text("select pg_last_wal_replay_lsn()::text"),
+        )
+
+
+async def get_current_lsn(engine: AsyncEngine) -> str:
+    async with engine.connect() as connection:
+        return await connection.scalar(
+            text("select pg_current_wal_lsn()::text"),
+        )
+
+
+class ReplicaPinMiddleware:
+    """
+    Pins clients whose requests committed into the primary, see the
+    module.  Sessions require pins only when a replica is configured.
+    """
+
+    def __init__(self, app, container: AsyncContainer):
+        self.app = app
+        self.container = container
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        pin = _Pin()
+
+        async def send_pinned(message):
+            if message["type"] == "http.response.start" and pin.required:
+                await self._pin(message)
+            await send(message)
+
+        token = _pin.set(pin)
+        try:
+            await self.app(scope, receive, send_pinned)
+        finally:
+            _pin.reset(token)
+
+    async def _pin(self, message):
+        # imported here, infrastructure imports this module
+        from char_rest_api.infrastructure import PostgresConfig
+
+        postgres_config = await self.container.get(PostgresConfig)
+        lsn = await get_current_lsn(await self.container.get(AsyncEngine))
+        headers = MutableHeaders(scope=message)
+        headers.append(REPLICA_LSN_HEADER, lsn)
+        headers.append(
+            "set-cookie",
+            f"{REPLICA_LSN_COOKIE}={lsn}; "
+            f"Max-Age={int(postgres_config.replica_pin_seconds)}; "
+            f"Path=/; HttpOnly; SameSite=Lax",
+        )
@@ -5,6 +5,7 @@ from . import (
     auth,
     space,
     challenge,
+    user,
 )
 
 router = APIRouter()
@@ -17,6 +18,7 @@ inner_router = APIRouter(
 )
 inner_router.include_router(space.router)
 inner_router.include_router(challenge.router)
+inner_router.include_router(user.router)
 
 router.include_router(outer_router)
 router.include_router(inner_router)
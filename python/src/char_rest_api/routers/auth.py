@@ -1,26 +1,51 @@
+from datetime import datetime
 from typing import Annotated
+from uuid import uuid4
 
 import bcrypt
 from authx import AuthX
 from dishka import FromDishka
 from dishka.integrations.fastapi import inject
 from fastapi import APIRouter, HTTPException, Form
+from starlette.requests import Request
 
 from pydantic import BaseModel, EmailStr
-from char_core.models.user import User
-from sqlalchemy import select
+from char_core.models.user import User, RefreshToken
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from char_rest_api.dtos.user import UserFullDTO
-from char_rest_api.infrastructure import openapi_auth_dep
+from char_core.models.statistics import UserStatistics
+from char_rest_api.dtos.user import UserFullDTO, UserStatisticsDTO
+from char_rest_api.infrastructure import (
+    openapi_auth_dep,
+    ReadOnlyAsyncSession,
+    ReadOnlyUser,
+    RestAPIConfig,
+)
+from char_rest_api.principal import get_access_token_claims, TokenVersions
 
 
 router = APIRouter()
 
 
+async def create_access_token(
+        session: AsyncSession,
+        security: AuthX,
+        rest_api_config: RestAPIConfig,
+        user_id: int,
+) -> str:
+    claims = await get_access_token_claims(
+        session=session,
+        user_id=user_id,
+        embed_spaces=rest_api_config.embed_claims,
+    )
+    return security.create_access_token(uid=str(user_id), data=claims)
+
+
 async def generic_get_token(
         session: AsyncSession,
         security: AuthX,
+        rest_api_config: RestAPIConfig,
         username: str,
         password: str,
 ):
@@ -39,24 +64,46 @@ async def generic_get_token(
         password.encode(),
         user.password_hash.encode(),
     )
-    if is_authenticated:
-        token = security.create_access_token(uid=str(user.id))
-        return {"access_token": token}
-    else:
+    if not is_authenticated:
         raise exception
 
+    jti = uuid4().hex
+    session.add(RefreshToken(
+        jti=jti,
+        user_id=user.id,
+        expires_at=(
+            datetime.now() + security.config.JWT_REFRESH_TOKEN_EXPIRES
+        ),
+    ))
+    await session.commit()
+
+    return {
+        "access_token": await create_access_token(
+            session=session,
+            security=security,
+            rest_api_config=rest_api_config,
+            user_id=user.id,
+        ),
+        "refresh_token": security.create_refresh_token(
+            uid=str(user.id),
+            data={"jti": jti},
+        ),
+    }
+
 
 @router.post("/token")
 @inject
 async def get_token(
         session: FromDishka[AsyncSession],
         security: FromDishka[AuthX],
+        rest_api_config: FromDishka[RestAPIConfig],
         username: Annotated[str, Form()],
         password: Annotated[str, Form()],
 ):
     return await generic_get_token(
         session=session,
         security=security,
+        rest_api_config=rest_api_config,
         username=username,
         password=password,
     )
@@ -72,16 +119,90 @@ class TokenRequest(BaseModel):
 async def get_token_json(
         session: FromDishka[AsyncSession],
         security: FromDishka[AuthX],
+        rest_api_config: FromDishka[RestAPIConfig],
         payload: TokenRequest,
 ):
     return await generic_get_token(
         session=session,
         security=security,
+        rest_api_config=rest_api_config,
         username=payload.username,
         password=payload.password,
     )
 
 
+@router.post("/token/refresh")
+@inject
+async def refresh_access_token(
+        session: FromDishka[AsyncSession],
+        security: FromDishka[AuthX],
+        rest_api_config: FromDishka[RestAPIConfig],
+        request: Request,
+):
+    """
+    Exchange the refresh token, passed as a bearer token, for a new
+    access token.  Unlike `/token` does not check the password.
+    """
+    payload = await security.refresh_token_required(request)
+    refresh_token = await session.get(RefreshToken, payload.jti)
+    if refresh_token is None or not refresh_token.is_active:
+        raise HTTPException(401, detail={"message": "Bad refresh token"})
+
+    return {
+        "access_token": await create_access_token(
+            session=session,
+            security=security,
+            rest_api_config=rest_api_config,
+            user_id=refresh_token.user_id,
+        ),
+    }
+
+
+@router.post("/token/revoke", status_code=204)
+@inject
+async def revoke_refresh_token(
+        session: FromDishka[AsyncSession],
+        security: FromDishka[AuthX],
+        request: Request,
+):
+    payload = await security.refresh_token_required(request)
+    stmt = (
+        update(RefreshToken)
+        .where(RefreshToken.jti == payload.jti)
+        .where(RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now())
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+
+@router.post(
+    "/token/revoke-all",
+    status_code=204,
+    dependencies=[openapi_auth_dep],
+)
+@inject
+async def revoke_all_tokens(
+        session: FromDishka[AsyncSession],
+        user: FromDishka[User],
+        token_versions: FromDishka[TokenVersions],
+):
+    """
+    Revoke all refresh tokens and access tokens of the current user.
+    Other instances of the API notice the revocation of access tokens
+    after `RestAPIConfig.token_version_cache_seconds`.
+    """
+    await User.revoke_access_tokens(session, user.id)
+    await session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user.id)
+        .where(RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now())
+    )
+    await session.commit()
+    token_versions.forget(user.id)
+
+
 class Register(BaseModel):
     email: EmailStr
     password: str
@@ -125,6 +246,11 @@ async def register(
 )
 @inject
 async def get_protected_resource(
-        user: FromDishka[User],
+        session: FromDishka[ReadOnlyAsyncSession],
+        user: FromDishka[ReadOnlyUser],
 ) -> UserFullDTO:
-    return UserFullDTO.model_validate(user)
+    result = UserFullDTO.model_validate(user)
+    statistics = await session.get(UserStatistics, user.id)
+    if statistics is not None:
+        result.statistics = UserStatisticsDTO.model_validate(statistics)
+    return result
@@ -2,13 +2,15 @@ import traceback
 from datetime import datetime
 from typing import Literal
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from starlette.requests import Request
+from starlette.responses import Response
 from pydantic import BaseModel
 from dishka import FromDishka
 from dishka.integrations.fastapi import inject
 
-from sqlalchemy import select, and_
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, update, bindparam, func
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
 
 from char_core.models.user import (
     User,
@@ -20,14 +22,44 @@ from char_core.models.challenge import (
     ChallengeMember,
     ChallengeStateEnum,
     Challenge,
+    ChallengeSnapshot,
+    ReviewKindEnum,
 )
+from char_core.models.history import (
+    RollupBucketEnum,
+    ChallengeRollup,
+    ChallengeMemberRollup,
+    load_sketch,
+)
+from char_core.models.base import any_of
 from char_core.models.space import SpaceMember, Space
+from char_core.notifications import (
+    notify_challenge_changed,
+    notify_challenge_updated,
+)
+from char_rest_api.caching import ChallengeCache
+from char_rest_api.coalescing import SingleFlight
+from char_rest_api.infrastructure import (
+    ReadOnlyAsyncSession,
+)
+from char_rest_api.principal import Principal
+from char_rest_api.rate_limiting import rate_limit
 from char_rest_api.dtos.challenge import (
     ChallengeDTO,
     ChallengeFullDTO,
     ChallengeResultDTO,
+    ChallengeHistoryPointDTO,
+    ChallengeRankDTO,
+    ChallengeRankNeighbourDTO,
+    ChallengeDistributionDTO,
+    ChallengePercentileDTO,
+    ChallengeHistogramBinDTO,
 )
-from char_rest_api.shortcuts import get_object_or_404
+from char_rest_api.shortcuts import (
+    get_object_or_404,
+    get_snapshot_response,
+)
+from char_rest_api.streaming import ExportFormatEnum, get_export_response
 
 
 router = APIRouter(
@@ -48,12 +80,14 @@ class CreateChallenge(BaseModel):
     ends_at_determination_fn: SelectionFnEnum | None
     ends_at_determination_argument: float | None
     results_aggregation_strategy: AggregationStrategy
+    results_aggregation_argument: float | None = None
     prize_determination_fn: SelectionFnEnum
     prize_determination_argument: float
 
 
 @router.post(
     "",
+    dependencies=[rate_limit("write")],
 )
 @inject
 async def create_challenge(
@@ -70,8 +104,10 @@ async def create_challenge(
     )
     challenge = Challenge(
         space_id=space_id,
+        participants_count=1,  # the creator
         **payload.dict(),
     )
+    challenge.get_aggregator()  # validates the argument
     session.add(challenge)
     challenge.members.append(ChallengeMember(
         user_id=user.id,
@@ -80,6 +116,7 @@ async def create_challenge(
         is_participant=True,
     ))
     await session.flush()
+    await notify_challenge_changed(session, challenge.id)
     await session.commit()
 
     return ChallengeDTO.model_validate(challenge)
@@ -90,8 +127,8 @@ async def create_challenge(
 )
 @inject
 async def get_challenges(
-        session: FromDishka[AsyncSession],
-        user: FromDishka[User],
+        session: FromDishka[ReadOnlyAsyncSession],
+        principal: FromDishka[Principal],
         space_id: int | Literal["*"],
         state: ChallengeStateEnum = None,
 ) -> list[ChallengeDTO]:
@@ -99,7 +136,7 @@ async def get_challenges(
         stmt = (
             select(Space)
             .join(SpaceMember, and_(SpaceMember.space_id == Space.id,
-                                    SpaceMember.user_id == user.id))
+                                    SpaceMember.user_id == principal.id))
         )
         spaces = await session.scalars(stmt)
         spaces = list(spaces)
@@ -108,9 +145,9 @@ async def get_challenges(
         spaces = [space]
 
     for space in spaces:
-        await space.ensure_access(
+        await principal.ensure_space_access(
             session=session,
-            user=user,
+            space_id=space.id,
             edit=False,
         )
 
@@ -128,33 +165,424 @@ async def get_challenges(
     ]
 
 
+async def _load_full_challenge(
+        read_only_engine: AsyncEngine,
+        engine: AsyncEngine,
+        challenge_cache: ChallengeCache,
+        cache_generation,
+        challenge_id: int,
+) -> tuple[bytes, bool]:
+    """
+    Shared by concurrent requests, see `SingleFlight`, so uses sessions
+    of its own.
+    :return: (payload, whether it is a packed snapshot)
+    """
+    async with AsyncSession(
+            bind=read_only_engine,
+            expire_on_commit=False,
+    ) as session:
+        # finalized challenge never changes, so it is served from the
+        # snapshot
+        payload = await session.scalar(
+            select(ChallengeSnapshot.payload)
+            .where(ChallengeSnapshot.challenge_id == challenge_id)
+        )
+        if payload is not None:
+            return payload, True
+
+        challenge: Challenge = await get_object_or_404(
+            session, Challenge, challenge_id)
+        content = ChallengeFullDTO.model_validate(challenge).model_dump_json()
+        content = content.encode()
+
+    if challenge.finalized_at is not None:
+        # first read since finalization.  serialized again from the
+        # primary, as a lagging replica would freeze stale results into
+        # the snapshot.  users (e.g. their emails and achievements) are
+        # served as of this moment from now on
+        async with AsyncSession(
+                bind=engine,
+                expire_on_commit=False,
+        ) as primary_session:
+            challenge = await get_object_or_404(
+                primary_session, Challenge, challenge_id)
+            content = ChallengeFullDTO.model_validate(challenge)
+            content = content.model_dump_json().encode()
+            await challenge.write_snapshot(primary_session, content)
+            await primary_session.commit()
+        return content, False
+
+    expires_at = None
+    if challenge.starts_at > datetime.now():
+        expires_at = challenge.starts_at  # the state changes
+    challenge_cache.put(challenge_id, cache_generation, content, expires_at)
+    return content, False
+
+
 @router.get(
     "/{challenge_id}",
 )
 @inject
 async def get_full_challenge(
-        session: FromDishka[AsyncSession],
-        user: FromDishka[User],
+        session: FromDishka[ReadOnlyAsyncSession],
+        engine: FromDishka[AsyncEngine],
+        principal: FromDishka[Principal],
+        challenge_cache: FromDishka[ChallengeCache],
+        single_flight: FromDishka[SingleFlight],
+        request: Request,
         challenge_id: int,
         space_id: int,
 ) -> ChallengeFullDTO:
+    """
+    Finalized challenges are served from a snapshot written by the first
+    read after finalization, users of members are as of that moment.
+    They can't be edited by the API, changes through the admin panel
+    discard the snapshot.
+    """
+    await principal.ensure_space_access(
+        session=session,
+        space_id=space_id,
+        edit=False,
+    )
+    await ChallengeMember.ensure_access(
+        session=session,
+        user=principal,
+        challenge_id=challenge_id,
+        space_id=space_id,
+    )
+
+    # read before loading, see `ChallengeCache`
+    cache_generation = challenge_cache.generation(challenge_id)
+    content = challenge_cache.get(challenge_id)
+    if content is not None:
+        return Response(content, media_type="application/json")
+
+    # requests authorized above share the load, the engine is a part of
+    # the key as replica pinned requests are loaded from the primary
+    read_only_engine = session.bind
+    payload, is_snapshot = await single_flight.do(
+        key=("challenge", challenge_id, cache_generation, read_only_engine),
+        fn=lambda: _load_full_challenge(
+            read_only_engine=read_only_engine,
+            engine=engine,
+            challenge_cache=challenge_cache,
+            cache_generation=cache_generation,
+            challenge_id=challenge_id,
+        ),
+    )
+    if is_snapshot:
+        return get_snapshot_response(request, payload)
+    return Response(payload, media_type="application/json")
+
+
+@router.get(
+    "/{challenge_id}/history",
+)
+@inject
+async def get_challenge_history(
+        session: FromDishka[ReadOnlyAsyncSession],
+        principal: FromDishka[Principal],
+        challenge_id: int,
+        space_id: int,
+        bucket: RollupBucketEnum = RollupBucketEnum.HOUR,
+        member_id: int | None = None,
+        since: datetime | None = None,
+) -> list[ChallengeHistoryPointDTO]:
+    """
+    Progress of the challenge (or of the single member if `member_id`
+    is specified) over time.  Served from rollups, so costs O(buckets).
+    """
     space: Space = await get_object_or_404(session, Space, space_id)
-    await space.ensure_access(
+    await principal.ensure_space_access(
         session=session,
-        user=user,
+        space_id=space.id,
         edit=False,
     )
-    challenge: Challenge = await get_object_or_404(
-        session, Challenge, challenge_id)
-    assert challenge.space is space
-    await challenge.ensure_member_access(
-        user=user,
+    await ChallengeMember.ensure_access(
+        session=session,
+        user=principal,
+        challenge_id=challenge_id,
+        space_id=space_id,
+    )
+
+    if member_id is None:
+        model = ChallengeRollup
+        stmt = select(model)
+    else:
+        model = ChallengeMemberRollup
+        stmt = select(model).where(model.member_id == member_id)
+    stmt = (
+        stmt
+        .where(model.challenge_id == challenge_id)
+        .where(model.bucket == bucket)
+        .order_by(model.bucket_start)
+    )
+    if since is not None:
+        stmt = stmt.where(model.bucket_start >= bucket.truncate(since))
+
+    points = await session.scalars(stmt)
+    return [
+        ChallengeHistoryPointDTO.model_validate(i)
+        for i in points
+    ]
+
+
+@router.get(
+    "/{challenge_id}/distribution",
+)
+@inject
+async def get_challenge_distribution(
+        session: FromDishka[ReadOnlyAsyncSession],
+        principal: FromDishka[Principal],
+        challenge_id: int,
+        space_id: int,
+        percentiles: list[float] = Query(default=[50, 90, 99]),
+        bins: int = Query(default=10, ge=1, le=100),
+) -> ChallengeDistributionDTO:
+    """
+    Percentiles and histogram of active results, estimated from the
+    sketch of the challenge.  Costs O(buckets of the sketch), which
+    doesn't depend on the number of results.
+    """
+    await principal.ensure_space_access(
+        session=session,
+        space_id=space_id,
+    )
+    await ChallengeMember.ensure_access(
+        session=session,
+        user=principal,
+        challenge_id=challenge_id,
+        space_id=space_id,
+    )
+    if any(not 0 <= i <= 100 for i in percentiles):
+        raise HTTPException(
+            status_code=422,
+            detail="Percentiles must be in [0, 100]",
+        )
+
+    sketch = await load_sketch(session, challenge_id)
+    # exact bounds are known from rollups
+    values_min, values_max = (await session.execute(
+        select(func.min(ChallengeRollup.values_min),
+               func.max(ChallengeRollup.values_max))
+        .where(ChallengeRollup.challenge_id == challenge_id)
+        .where(ChallengeRollup.bucket == RollupBucketEnum.DAY)
+    )).one()
+
+    result = ChallengeDistributionDTO(
+        results_count=sketch.count,
+        values_min=values_min,
+        values_max=values_max,
+        relative_accuracy=sketch.relative_accuracy,
+        percentiles=[],
+        histogram=[],
+    )
+    if not sketch.count or values_min is None:
+        return result
+
+    for percentile in percentiles:
+        value = sketch.quantile(percentile / 100)
+        result.percentiles.append(ChallengePercentileDTO(
+            percentile=percentile,
+            value=min(max(value, values_min), values_max),
+        ))
+    result.histogram = [
+        ChallengeHistogramBinDTO(lower=lower, upper=upper, results_count=count)
+        for lower, upper, count in sketch.histogram(
+            bins, values_min, values_max)
+    ]
+    return result
+
+
+@router.get(
+    "/{challenge_id}/results/export",
+)
+@inject
+async def export_challenge_results(
+        session: FromDishka[ReadOnlyAsyncSession],
+        principal: FromDishka[Principal],
+        challenge_id: int,
+        space_id: int,
+        format: ExportFormatEnum = ExportFormatEnum.CSV,
+):
+    space: Space = await get_object_or_404(session, Space, space_id)
+    await principal.ensure_space_access(
+        session=session,
+        space_id=space.id,
+        edit=False,
+    )
+    await ChallengeMember.ensure_access(
+        session=session,
+        user=principal,
+        challenge_id=challenge_id,
+        space_id=space_id,
+        administrator=True,
+    )
+    stmt = (
+        select(
+            ChallengeResult.id,
+            ChallengeResult.member_id,
+            ChallengeMember.user_id,
+            User.full_name,
+            ChallengeResult.submitted_value,
+            ChallengeResult.estimation_value,
+            ChallengeResult.verification_value,
+            ChallengeResult.created_at,
+        )
+        .join(ChallengeMember, ChallengeMember.id == ChallengeResult.member_id)
+        .join(User, User.id == ChallengeMember.user_id)
+        .where(ChallengeResult.challenge_id == challenge_id)
+        .order_by(ChallengeResult.id)
+    )
+    return get_export_response(
+        session=session,
+        stmt=stmt,
+        export_format=format,
+        filename=f"challenge-{challenge_id}-results",
+    )
+
+
+@router.get(
+    "/{challenge_id}/standings/export",
+)
+@inject
+async def export_challenge_standings(
+        session: FromDishka[ReadOnlyAsyncSession],
+        principal: FromDishka[Principal],
+        challenge_id: int,
+        space_id: int,
+        format: ExportFormatEnum = ExportFormatEnum.CSV,
+):
+    space: Space = await get_object_or_404(session, Space, space_id)
+    await principal.ensure_space_access(
+        session=session,
+        space_id=space.id,
+        edit=False,
+    )
+    await ChallengeMember.ensure_access(
+        session=session,
+        user=principal,
+        challenge_id=challenge_id,
+        space_id=space_id,
+        administrator=True,
+    )
+    prize_determination_fn = await session.scalar(
+        select(Challenge.prize_determination_fn)
+        .where(Challenge.id == challenge_id)
+    )
+    order = ChallengeMember.cached_aggregated_result
+    if not prize_determination_fn.is_ascending:
+        order = order.desc()
+
+    stmt = (
+        select(
+            ChallengeMember.id.label("member_id"),
+            ChallengeMember.user_id,
+            User.full_name,
+            ChallengeMember.cached_aggregated_result.label(
+                "aggregated_result"),
+            ChallengeMember.is_winner,
+        )
+        .join(User, User.id == ChallengeMember.user_id)
+        .where(ChallengeMember.challenge_id == challenge_id)
+        .where(ChallengeMember.is_participant)
+        .order_by(order, ChallengeMember.id)
+    )
+    return get_export_response(
+        session=session,
+        stmt=stmt,
+        export_format=format,
+        filename=f"challenge-{challenge_id}-standings",
+    )
+
+
+@router.get(
+    "/{challenge_id}/members/me/rank",
+)
+@inject
+async def get_my_rank(
+        session: FromDishka[ReadOnlyAsyncSession],
+        principal: FromDishka[Principal],
+        challenge_id: int,
+        space_id: int,
+        neighbours: int = Query(default=1, ge=0, le=10),
+) -> ChallengeRankDTO:
+    """
+    Rank of the current user among participants.  Members are not
+    loaded, every query is a range scan of the standings index, so
+    the cost grows with the rank rather than with participants.
+
+    Ties are not broken: participants with the result equal to the one
+    of the user share the rank and are listed neither ahead nor behind.
+    """
+    await principal.ensure_space_access(
+        session=session,
+        space_id=space_id,
+    )
+    member = await ChallengeMember.ensure_access(
+        session=session,
+        user=principal,
+        challenge_id=challenge_id,
+        space_id=space_id,
+        participant=True,
+    )
+    prize_determination_fn, participants_count = (await session.execute(
+        select(Challenge.prize_determination_fn,
+               Challenge.participants_count)
+        .where(Challenge.id == challenge_id)
+    )).one()
+    result = ChallengeMember.cached_aggregated_result
+    value = member.cached_aggregated_result
+    if prize_determination_fn.is_ascending:
+        is_better, is_worse = result < value, result > value
+        best_first, worst_first = result, result.desc()
+    else:
+        is_better, is_worse = result > value, result < value
+        best_first, worst_first = result.desc(), result
+
+    participants = (
+        select(ChallengeMember.id.label("member_id"),
+               ChallengeMember.user_id,
+               result.label("aggregated_result"))
+        .where(ChallengeMember.challenge_id == challenge_id)
+        .where(ChallengeMember.is_participant)
+    )
+    # index only scan of the better participants only
+    better_count = await session.scalar(
+        select(func.count())
+        .where(ChallengeMember.challenge_id == challenge_id)
+        .where(ChallengeMember.is_participant)
+        .where(is_better)
+    )
+
+    ahead = list(await session.execute(
+        participants.where(is_better).order_by(worst_first).limit(neighbours)
+    ))
+    ahead.reverse()
+    behind = list(await session.execute(
+        participants.where(is_worse).order_by(best_first).limit(neighbours)
+    ))
+
+    gap_to_next = None
+    if ahead:
+        gap_to_next = abs(ahead[-1].aggregated_result - value)
+
+    return ChallengeRankDTO(
+        member_id=member.id,
+        aggregated_result=value,
+        rank=better_count + 1,
+        participants_count=participants_count,
+        gap_to_next=gap_to_next,
+        ahead=[ChallengeRankNeighbourDTO.model_validate(i._mapping)
+               for i in ahead],
+        behind=[ChallengeRankNeighbourDTO.model_validate(i._mapping)
+                for i in behind],
     )
-    return ChallengeFullDTO.model_validate(challenge)
 
 
 @router.post(
-    "/{challenge_id}/members"
+    "/{challenge_id}/members",
+    dependencies=[rate_limit("write")],
 )
 @inject
 async def join_challenge(
@@ -189,6 +617,12 @@ async def join_challenge(
     )
     session.add(member)
     await session.flush()
+    await session.execute(
+        update(Challenge)
+        .where(Challenge.id == challenge.id)
+        .values(participants_count=Challenge.participants_count + 1)
+    )
+    await notify_challenge_updated(session, challenge.id)
     await session.commit()
     return ChallengeFullDTO.model_validate(challenge)
 
@@ -198,7 +632,8 @@ class SubmitChallengeResult(BaseModel):
 
 
 @router.post(
-    "/{challenge_id}/submit-result"
+    "/{challenge_id}/submit-result",
+    dependencies=[rate_limit("submit-result")],
 )
 @inject
 async def submit_challenge_result(
@@ -223,6 +658,7 @@ async def submit_challenge_result(
     )
     result = ChallengeResult(
         member_id=member.id,
+        challenge_id=challenge.id,
         submitted_value=payload.submitted_value,
     )
     session.add(result)
@@ -230,8 +666,11 @@ async def submit_challenge_result(
     await session.commit()
 
     try:
+        # recompute is skipped when the challenge is being updated
+        # concurrently, the next daemon sweep picks the result then
         await challenge.update_lifecycle_state(
             session=session,
+            wait=False,
         )
     except Exception as _:
         print("Error while updating lifecycle state...")
@@ -240,6 +679,135 @@ async def submit_challenge_result(
     return ChallengeResultDTO.model_validate(result)
 
 
+async def _ensure_reviewer_access(
+        session: AsyncSession,
+        user: User | Principal,
+        challenge_id: int,
+        space_id: int,
+        kind: ReviewKindEnum,
+):
+    # membership of the challenge is checked within the space
+    await ChallengeMember.ensure_access(
+        session=session,
+        user=user,
+        challenge_id=challenge_id,
+        space_id=space_id,
+        refree=kind is ReviewKindEnum.ESTIMATION,
+        administrator=kind is ReviewKindEnum.VERIFICATION,
+    )
+
+
+@router.get(
+    "/{challenge_id}/results/pending",
+)
+@inject
+async def get_pending_results(
+        session: FromDishka[ReadOnlyAsyncSession],
+        principal: FromDishka[Principal],
+        challenge_id: int,
+        space_id: int,
+        kind: ReviewKindEnum,
+        after: int | None = Query(
+            default=None,
+            description="Id of the last result from the previous page",
+        ),
+        limit: int = Query(default=100, ge=1, le=1000),
+) -> list[ChallengeResultDTO]:
+    """
+    Results waiting for the estimation (by refrees) or the verification
+    (by administrators), oldest first.
+    """
+    await _ensure_reviewer_access(
+        session, principal, challenge_id, space_id, kind)
+
+    # served by the partial index of the review queue
+    column = getattr(ChallengeResult, kind.column_name)
+    stmt = (
+        select(ChallengeResult)
+        .where(ChallengeResult.challenge_id == challenge_id)
+        .where(column.is_(None))
+        .order_by(ChallengeResult.id)
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.where(ChallengeResult.id > after)
+
+    results = await session.scalars(stmt)
+    return [ChallengeResultDTO.model_validate(i) for i in results]
+
+
+class ReviewItem(BaseModel):
+    result_id: int
+    value: float | None = None
+
+
+class ReviewResults(BaseModel):
+    kind: ReviewKindEnum
+    items: list[ReviewItem]
+
+
+@router.post(
+    "/{challenge_id}/results/review",
+    dependencies=[rate_limit("write")],
+)
+@inject
+async def review_results(
+        session: FromDishka[AsyncSession],
+        user: FromDishka[User],
+        challenge_id: int,
+        space_id: int,
+        payload: ReviewResults,
+) -> list[ChallengeResultDTO]:
+    """
+    Estimate or verify pending results at once.  Items without
+    the value approve the submitted value.  Already reviewed results
+    are left untouched.
+    """
+    await _ensure_reviewer_access(
+        session, user, challenge_id, space_id, payload.kind)
+    if not payload.items:
+        return []
+
+    table = ChallengeResult.__table__
+    column = table.c[payload.kind.column_name]
+    stmt = (
+        update(table)
+        .where(table.c.challenge_id == challenge_id)
+        .where(table.c.id == bindparam("result_id"))
+        .where(column.is_(None))
+        .values({column: func.coalesce(
+            bindparam("value", type_=column.type),
+            table.c.submitted_value,
+        )})
+    )
+    # single executemany round trip
+    await session.execute(stmt, [i.model_dump() for i in payload.items])
+    # cached challenges include reviewed values of results
+    await notify_challenge_updated(session, challenge_id)
+    await session.commit()
+
+    challenge: Challenge = await get_object_or_404(
+        session, Challenge, challenge_id)
+    try:
+        # one recompute for the whole batch
+        await challenge.update_lifecycle_state(
+            session=session,
+        )
+    except Exception as _:
+        print("Error while updating lifecycle state...")
+        print(traceback.format_exc())
+
+    stmt = (
+        select(ChallengeResult)
+        .where(ChallengeResult.challenge_id == challenge_id)
+        .where(any_of(ChallengeResult.id,
+                      [i.result_id for i in payload.items]))
+        .order_by(ChallengeResult.id)
+    )
+    results = await session.scalars(stmt)
+    return [ChallengeResultDTO.model_validate(i) for i in results]
+
+
 class EditChallenge(BaseModel):
     name: str = None
     description: str = None
@@ -252,6 +820,7 @@ class EditChallenge(BaseModel):
     ends_at_determination_fn: SelectionFnEnum = None
     ends_at_determination_argument: float = None
     results_aggregation_strategy: AggregationStrategy = None
+    results_aggregation_argument: float | None = None
     prize_determination_fn: SelectionFnEnum = None
 
     def update_model(self, model):
@@ -261,6 +830,7 @@ class EditChallenge(BaseModel):
 
 @router.patch(
     "/{challenge_id}",
+    dependencies=[rate_limit("write")],
 )
 @inject
 async def edit_challenge(
@@ -283,8 +853,24 @@ async def edit_challenge(
         user=user,
         administrator=True,
     )
+    if challenge.finalized_at is not None:
+        # winners are determined and the snapshot is written already
+        raise HTTPException(
+            status_code=400,
+            detail="Finalized challenge can't be edited.",
+        )
     payload.update_model(challenge)
+    challenge.get_aggregator()  # validates the argument
+    if payload.model_fields_set & {
+        "is_verification_required",
+        "is_estimation_required",
+        "results_aggregation_strategy",
+        "results_aggregation_argument",
+    }:
+        # members are aggregated again by the next lifecycle update
+        challenge.is_aggregation_stale = True
     await session.flush()
+    await notify_challenge_changed(session, challenge.id)
     await session.commit()
 
     return ChallengeFullDTO.model_validate(challenge)
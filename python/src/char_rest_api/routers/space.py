@@ -1,21 +1,33 @@
 from typing import Literal
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 from pydantic import BaseModel
 from dishka import FromDishka
 from dishka.integrations.fastapi import inject
 
-from sqlalchemy import select, and_, update
+from sqlalchemy import select, and_, update, func, type_coerce
+from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from char_core.models.challenge import Achievement
+from char_core.models.challenge import (
+    Achievement,
+    Challenge,
+    ChallengeMember,
+    ChallengeResult,
+)
 from char_core.models.user import (
     User,
 )
 from char_core.models.space import SpaceMember, Space
 from char_rest_api.dtos.space import SpaceDTO, AchievementDTO
 from char_rest_api.dtos.base import BaseDTO
+from char_rest_api.infrastructure import (
+    ReadOnlyAsyncSession,
+)
+from char_rest_api.principal import Principal
+from char_rest_api.rate_limiting import rate_limit
+from char_rest_api.shortcuts import get_object_or_404
+from char_rest_api.streaming import ExportFormatEnum, get_export_response
 
 router = APIRouter(
     prefix="/spaces",
@@ -28,17 +40,50 @@ router = APIRouter(
 )
 @inject
 async def get_all_spaces(
-        session: FromDishka[AsyncSession],
-        user: FromDishka[User],
+        session: FromDishka[ReadOnlyAsyncSession],
+        principal: FromDishka[Principal],
+        after: int | None = Query(
+            default=None,
+            description="Id of the last space from the previous page",
+        ),
+        limit: int = Query(default=100, ge=1, le=1000),
 ) -> list[SpaceDTO]:
+    # single projection query: neither members nor achievements are
+    # hydrated, achievements are aggregated to json by postgres
+    achievements = (
+        select(func.coalesce(
+            func.json_agg(func.json_build_object(
+                "id", Achievement.id,
+                "space_id", Achievement.space_id,
+                "name", Achievement.name,
+            )),
+            func.json_build_array(),
+        ))
+        .where(Achievement.space_id == Space.id)
+        .correlate(Space)
+        .scalar_subquery()
+    )
     stmt = (
-        select(Space)
+        select(
+            Space.id,
+            Space.name,
+            Space.description,
+            Space.invitation_token,
+            Space.members_count,
+            type_coerce(achievements, JSON).label("achievements"),
+        )
         .join(SpaceMember,
               and_(SpaceMember.space_id == Space.id,
-                   SpaceMember.user_id == user.id))
-        .options(selectinload(Space.members))
+                   SpaceMember.user_id == principal.id))
+        # pages of memberships of the principal, walking the unique
+        # (user_id, space_id) index
+        .order_by(SpaceMember.space_id)
+        .limit(limit)
     )
-    results = await session.scalars(stmt)
+    if after is not None:
+        stmt = stmt.where(SpaceMember.space_id > after)
+
+    results = await session.execute(stmt)
     return list(map(SpaceDTO.model_validate, results))
 
 
@@ -47,8 +92,8 @@ async def get_all_spaces(
 )
 @inject
 async def get_all_space_achievements(
-        session: FromDishka[AsyncSession],
-        user: FromDishka[User],
+        session: FromDishka[ReadOnlyAsyncSession],
+        principal: FromDishka[Principal],
         space_id: int | Literal["*"],
 ) -> list[AchievementDTO]:
     stmt = (
@@ -57,7 +102,7 @@ async def get_all_space_achievements(
               Space.id == Achievement.space_id)
         .join(SpaceMember,
               and_(SpaceMember.space_id == Space.id,
-                   SpaceMember.user_id == user.id))
+                   SpaceMember.user_id == principal.id))
     )
     if space_id != "*":
         stmt = stmt.where(Space.id == space_id)
@@ -67,6 +112,49 @@ async def get_all_space_achievements(
             for i in results]
 
 
+@router.get(
+    "/{space_id}/results/export",
+)
+@inject
+async def export_space_results(
+        session: FromDishka[ReadOnlyAsyncSession],
+        principal: FromDishka[Principal],
+        space_id: int,
+        format: ExportFormatEnum = ExportFormatEnum.CSV,
+):
+    space: Space = await get_object_or_404(session, Space, space_id)
+    await principal.ensure_space_access(
+        session=session,
+        space_id=space.id,
+        edit=True,
+    )
+    stmt = (
+        select(
+            ChallengeResult.id,
+            ChallengeResult.challenge_id,
+            Challenge.name.label("challenge_name"),
+            ChallengeResult.member_id,
+            ChallengeMember.user_id,
+            User.full_name,
+            ChallengeResult.submitted_value,
+            ChallengeResult.estimation_value,
+            ChallengeResult.verification_value,
+            ChallengeResult.created_at,
+        )
+        .join(Challenge, Challenge.id == ChallengeResult.challenge_id)
+        .join(ChallengeMember, ChallengeMember.id == ChallengeResult.member_id)
+        .join(User, User.id == ChallengeMember.user_id)
+        .where(Challenge.space_id == space_id)
+        .order_by(ChallengeResult.challenge_id, ChallengeResult.id)
+    )
+    return get_export_response(
+        session=session,
+        stmt=stmt,
+        export_format=format,
+        filename=f"space-{space_id}-results",
+    )
+
+
 class CreateSpace(BaseModel):
     name: str
     description: str = ""
@@ -74,6 +162,7 @@ class CreateSpace(BaseModel):
 
 @router.post(
     "",
+    dependencies=[rate_limit("write")],
 )
 @inject
 async def create_space(
@@ -108,7 +197,8 @@ class JoinSpaceByToken(BaseDTO):
 
 
 @router.post(
-    "/join-by-token"
+    "/join-by-token",
+    dependencies=[rate_limit("write")],
 )
 @inject
 async def join_space_by_token(
@@ -0,0 +1,54 @@
+from dishka import FromDishka
+from dishka.integrations.fastapi import inject
+from fastapi import APIRouter, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from char_core.models.space import SpaceMember
+from char_core.models.statistics import UserStatistics
+from char_core.models.user import User
+from char_rest_api.dtos.user import UserProfileDTO, UserStatisticsDTO
+from char_rest_api.infrastructure import ReadOnlyAsyncSession
+from char_rest_api.principal import Principal
+from char_rest_api.shortcuts import get_object_or_404
+
+router = APIRouter(
+    prefix="/users",
+    tags=["Users"],
+)
+
+
+@router.get(
+    "/{user_id}",
+)
+@inject
+async def get_user_profile(
+        session: FromDishka[ReadOnlyAsyncSession],
+        principal: FromDishka[Principal],
+        user_id: int,
+) -> UserProfileDTO:
+    """
+    Profiles are visible to members of the spaces of the user only,
+    other users are reported as not found, so ids can't be enumerated.
+    """
+    if user_id != principal.id:
+        other = aliased(SpaceMember)
+        stmt = (
+            select(SpaceMember.space_id)
+            .join(other, other.space_id == SpaceMember.space_id)
+            .where(SpaceMember.user_id == principal.id)
+            .where(other.user_id == user_id)
+            .limit(1)
+        )
+        if await session.scalar(stmt) is None:
+            # same as for missing users
+            raise HTTPException(
+                status_code=404,
+                detail="Entity User not found",
+            )
+    user: User = await get_object_or_404(session, User, user_id)
+    result = UserProfileDTO.model_validate(user)
+    statistics = await session.get(UserStatistics, user_id)
+    if statistics is not None:
+        result.statistics = UserStatisticsDTO.model_validate(statistics)
+    return result
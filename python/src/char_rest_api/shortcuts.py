@@ -1,5 +1,9 @@
 from typing import TypeVar, Type
 from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+
+from char_core.models.challenge import ChallengeSnapshot
 
 _T = TypeVar("_T")
 
@@ -12,3 +16,21 @@ async def get_object_or_404(session, model_type: Type[_T], ident) -> _T:
             detail=f"Entity {model_type.__name__} not found",
         )
     return result
+
+
+def get_snapshot_response(request: Request, payload: bytes) -> Response:
+    """
+    Respond with the snapshot json, skipping decompression if the
+    client accepts deflate (zlib) content encoding.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if "deflate" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "deflate"
+        content = payload
+    else:
+        content = ChallengeSnapshot.unpack(payload)
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers=headers,
+    )
@@ -0,0 +1,50 @@
+"""
+Startup instrumentation.
+
+Phases of the startup are timed and reported along with the number of
+modules imported within each of them.  For the detailed per module
+import time run the process with `python -X importtime`.
+"""
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupTimings:
+    def __init__(self, name: str):
+        self.name = name
+        self.phases: list[tuple[str, float, int]] = []
+        self._modules_count = 0
+
+    def record_imports(self):
+        """
+        Record the time spent before the entry point was called,
+        which is dominated by imports.  CPU time of the process is used,
+        as the wall clock start of the interpreter is not known.
+        """
+        modules_count = len(sys.modules)
+        self.phases.append(("imports", time.process_time(), modules_count))
+        self._modules_count = modules_count
+
+    @contextmanager
+    def phase(self, name: str):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            modules_count = len(sys.modules)
+            self.phases.append((
+                name,
+                time.perf_counter() - started_at,
+                modules_count - self._modules_count,
+            ))
+            self._modules_count = modules_count
+
+    def report(self):
+        total = sum(seconds for _, seconds, _ in self.phases)
+        for name, seconds, modules_count in self.phases:
+            print(
+                f"[{self.name}]: startup phase {name}: "
+                f"{seconds * 1000:.0f} ms, {modules_count} modules imported"
+            )
+        print(f"[{self.name}]: started in {total * 1000:.0f} ms")
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import StreamingResponse
+
+EXPORT_BATCH_SIZE = 1000
+
+
+class ExportFormatEnum(Enum):
+    CSV = "CSV"
+    NDJSON = "NDJSON"
+
+    @property
+    def media_type(self) -> str:
+        if self is ExportFormatEnum.CSV:
+            return "text/csv"
+        elif self is ExportFormatEnum.NDJSON:
+            return "application/x-ndjson"
+        else:
+            raise NotImplementedError(self)
+
+    @property
+    def extension(self) -> str:
+        return self.value.lower()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"{type(value).__name__} is not json serializable")
+
+
+async def _encode_rows(
+        session: AsyncSession,
+        stmt: Select,
+        export_format: ExportFormatEnum,
+) -> AsyncIterator[bytes]:
+    # server side cursor, only one batch of rows is held in memory
+    result = await session.stream(
+        stmt.execution_options(yield_per=EXPORT_BATCH_SIZE),
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    if export_format is ExportFormatEnum.CSV:
+        writer.writerow(result.keys())
+
+    async for partition in result.mappings().partitions():
+        for row in partition:
+            if export_format is ExportFormatEnum.CSV:
+                writer.writerow(
+                    i.value if isinstance(i, Enum) else i
+                    for i in row.values()
+                )
+            else:
+                buffer.write(json.dumps(dict(row), default=_json_default))
+                buffer.write("\n")
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def get_export_response(
+        session: AsyncSession,
+        stmt: Select,
+        export_format: ExportFormatEnum,
+        filename: str,
+) -> StreamingResponse:
+    """
+    Stream rows of the column projection `stmt` with constant memory.
+
+    Session must stay open until the response is sent, which is the
+    case for dishka request scoped sessions.
+    """
+    return StreamingResponse(
+        _encode_rows(session, stmt, export_format),
+        media_type=export_format.media_type,
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{filename}.{export_format.extension}"'
+            ),
+        },
+    )